@@ -1,13 +1,16 @@
 import asyncio
 import random
+import threading
+import uuid
 import streamlit as st
 from dotenv import load_dotenv
 
-from src.chain import ask_question, create_chain
+# Only light modules are imported here. The langchain, qdrant, fastembed,
+# flashrank and groq stacks are imported inside the functions that need them, so
+# the upload screen renders (and every rerun finishes) without loading them.
+from src.catalog import collection_id, get_catalog
 from src.config import Config
-from src.ingestor import Ingestor
-from src.model import create_llm
-from src.retriever import create_retriever
+from src.registry import registry
 from src.uploader import upload_files
 
 load_dotenv()
@@ -26,16 +29,51 @@ LOADING_MESSAGES = [
 ]
 
 
+def warm_up():
+    from src.model import warm_up_models
+
+    warm_up_models()
+
+
+@st.cache_resource(show_spinner=False)
+def start_model_warm_up():
+    thread = threading.Thread(target=warm_up, daemon=True)
+    thread.start()
+    return thread
+
+
 @st.cache_resource(show_spinner=False)
-def build_qa_chain(files):
-    file_paths = upload_files(files)
-    vector_store = Ingestor().ingest(file_paths)
+def build_qa_chain(collection, _uploads, _on_progress=None):
+    from src.chain import create_chain
+    from src.ingestor import Ingestor
+    from src.model import create_llm
+    from src.retriever import create_retriever
+
+    # Collections are named by the content of their files, so a file set that
+    # was indexed before (by anyone, before any restart) is opened as it is.
+    digests = {upload.name: upload.digest for upload in _uploads}
+    catalog = get_catalog()
+    database_dir = catalog.open(collection, digests)
+    vector_store = None
+    if not catalog.is_ready(collection):
+        vector_store = Ingestor().ingest(
+            [upload.path for upload in _uploads],
+            on_progress=_on_progress,
+            database_dir=database_dir,
+            digests=digests,
+        )
+        catalog.mark_ready(collection)
+        catalog.collect_garbage()
     llm = create_llm()
-    retriever = create_retriever(llm, vector_store=vector_store)
-    return create_chain(llm, retriever)
+    retriever = create_retriever(
+        llm, vector_store=vector_store, database_dir=database_dir
+    )
+    return create_chain(llm, retriever, database_dir=database_dir)
 
 
 async def ask_chain(question: str, chain):
+    from src.chain import ask_question
+
     full_response = ""
     assistant = st.chat_message(
         "assistant", avatar=str(Config.Path.IMAGES_DIR / "assistant-avatar.png")
@@ -43,20 +81,36 @@ async def ask_chain(question: str, chain):
     with assistant:
         message_placeholder = st.empty()
         message_placeholder.status(random.choice(LOADING_MESSAGES), state="running")
-        documents = []
-        async for event in ask_question(chain, question, session_id="session-id-42"):
+        documents, timings = [], {}
+        async for event in ask_question(
+            chain, question, session_id=st.session_state.session_id
+        ):
             if type(event) is str:
                 full_response += event
                 message_placeholder.markdown(full_response)
             if type(event) is list:
                 documents.extend(event)
+            if type(event) is dict:
+                timings = event
         for i, doc in enumerate(documents):
             with st.expander(f"Sumber #{i+1}"):
                 st.write(doc.page_content)
+        if Config.DEBUG:
+            show_timings(timings)
 
     st.session_state.messages.append({"role": "assistant", "content": full_response})
 
 
+def show_timings(timings):
+    from src.metrics import get_metrics
+
+    with st.expander("Rincian waktu"):
+        st.caption("Permintaan ini")
+        st.json(timings)
+        st.caption("Semua permintaan")
+        st.json(get_metrics().snapshot(), expanded=False)
+
+
 def show_upload_documents():
     holder = st.empty()
     with holder.container():
@@ -65,13 +119,38 @@ def show_upload_documents():
         uploaded_files = st.file_uploader(
             label="Unggah file PDF", type=["pdf"], accept_multiple_files=True
         )
+    # Started after the upload screen is drawn so loading models never delays it.
+    if Config.Model.WARM_UP:
+        start_model_warm_up()
     if not uploaded_files:
         st.warning("Silakan unggah dokumen PDF untuk melanjutkan!")
         st.stop()
 
+    # Each upload is streamed to disk and hashed once per session, not per rerun.
+    upload_key = tuple(file.file_id for file in uploaded_files)
+    if st.session_state.get("upload_key") != upload_key:
+        st.session_state.upload_key = upload_key
+        st.session_state.uploads = upload_files(uploaded_files)
+    uploads = st.session_state.uploads
+
     with st.spinner("Menganalisis dokumen Anda..."):
         holder.empty()
-        return build_qa_chain(uploaded_files)
+        progress_bar = st.empty()
+
+        def show_progress(progress):
+            progress_bar.progress(
+                progress.files_done / max(progress.files_total, 1),
+                text=f"Memproses dokumen {progress.files_done}/{progress.files_total} "
+                f"({progress.chunks_done} potongan teks)",
+            )
+
+        chain = build_qa_chain(
+            collection_id({upload.name: upload.digest for upload in uploads}),
+            uploads,
+            _on_progress=show_progress,
+        )
+        progress_bar.empty()
+        return chain
 
 
 def show_message_history():
@@ -110,6 +189,9 @@ st.html(
 """
 )
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
 if "messages" not in st.session_state:
     st.session_state.messages = [
         {
@@ -126,6 +208,18 @@ if Config.CONVERSATION_MESSAGES_LIMIT > 0 and Config.CONVERSATION_MESSAGES_LIMIT
     )
     st.stop()
 
+if Config.DEBUG:
+    with st.sidebar.expander("Model"):
+        st.json(registry.metrics())
+    with st.sidebar.expander("Batching"):
+        from src.batching import batching_metrics
+
+        st.json(batching_metrics())
+    with st.sidebar.expander("LLM cache"):
+        from src.llm_cache import response_cache_metrics
+
+        st.json(response_cache_metrics())
+
 chain = show_upload_documents()
 show_message_history()
 show_chat_input(chain)
\ No newline at end of file
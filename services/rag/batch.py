@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from src.config import Config
+from src.stats import percentile
+
+load_dotenv()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Answer a file of questions")
+    parser.add_argument(
+        "input",
+        type=Path,
+        help='JSONL with a "question" (and optional "id") per line, or a CSV '
+        "with those columns",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Write answers as JSONL (default: stdout)"
+    )
+    parser.add_argument("--summary", type=Path, help="Write the summary as JSON")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Questions answered at once"
+    )
+    parser.add_argument(
+        "--documents",
+        type=Path,
+        help="Ingest the PDFs in this directory first "
+        "(otherwise the existing collection is used)",
+    )
+    parser.add_argument(
+        "--fake-llm",
+        action="store_true",
+        help="Answer with a canned local model, so no LLM API is needed",
+    )
+    parser.add_argument(
+        "--no-reranker", action="store_true", help="Disable the FlashRank reranker"
+    )
+    parser.add_argument(
+        "--no-answer-cache",
+        action="store_true",
+        help="Do not serve similar questions from the semantic answer cache",
+    )
+    return parser.parse_args()
+
+
+def read_rows(path: Path) -> List[Tuple[int, object]]:
+    """Every CSV row or JSONL value with its line number; bad JSON becomes None."""
+    with path.open(newline="", encoding="utf-8") as f:
+        if path.suffix == ".csv":
+            reader = csv.DictReader(f)
+            return [(reader.line_num, row) for row in reader]
+        rows = []
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((line_number, json.loads(line)))
+            except json.JSONDecodeError:
+                rows.append((line_number, None))
+        return rows
+
+
+def read_questions(path: Path) -> List[Tuple[str, str]]:
+    """The (id, question) pairs of the input; rows without a question are skipped."""
+    questions, skipped = [], []
+    for i, (line_number, row) in enumerate(read_rows(path), start=1):
+        question = row.get("question") if isinstance(row, dict) else None
+        question = "" if question is None else str(question).strip()
+        if not question:
+            skipped.append(line_number)
+            continue
+        row_id = row.get("id")
+        questions.append((str(i if row_id in (None, "") else row_id), question))
+    if skipped:
+        lines = ", ".join(map(str, skipped))
+        print(f"Skipped lines without a question: {lines}", file=sys.stderr)
+    return questions
+
+
+async def answer_question(chain, question: str) -> dict:
+    from src.chain import ask_question
+
+    answer, sources, timings = [], [], {}
+    start = time.perf_counter()
+    try:
+        # A fresh session per question keeps answers independent of each other.
+        async for event in ask_question(chain, question, str(uuid.uuid4())):
+            if type(event) is str:
+                answer.append(event)
+            elif type(event) is list:
+                sources.extend(
+                    {
+                        "source": document.metadata.get("source"),
+                        "start_index": document.metadata.get("start_index"),
+                        "content": document.page_content,
+                    }
+                    for document in event
+                )
+            elif type(event) is dict:
+                timings = event
+        error = None
+    except Exception as e:
+        error = str(e)
+    return {
+        "answer": "".join(answer),
+        "sources": sources,
+        "timings": timings,
+        "latency_seconds": round(time.perf_counter() - start, 4),
+        "error": error,
+    }
+
+
+async def run(chain, questions: List[Tuple[str, str]], concurrency: int, output):
+    # Identical questions are answered once and the result is written for each id.
+    ids_by_question: Dict[str, List[str]] = {}
+    for question_id, question in questions:
+        ids_by_question.setdefault(question, []).append(question_id)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def worker(question: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            result = await answer_question(chain, question)
+        latencies.append(result["latency_seconds"])
+        errors += result["error"] is not None
+        for question_id in ids_by_question[question]:
+            output.write(
+                json.dumps({"id": question_id, "question": question, **result}) + "\n"
+            )
+        output.flush()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(question) for question in ids_by_question))
+    elapsed = time.perf_counter() - start
+    return {
+        "questions": len(questions),
+        "unique_questions": len(ids_by_question),
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "questions_per_second": round(len(ids_by_question) / elapsed, 2),
+        "p50_seconds": round(percentile(latencies, 50), 4) if latencies else None,
+        "p90_seconds": round(percentile(latencies, 90), 4) if latencies else None,
+        "p99_seconds": round(percentile(latencies, 99), 4) if latencies else None,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    Config.Model.USE_FAKE = args.fake_llm or Config.Model.USE_FAKE
+    Config.Retriever.USE_RERANKER = (
+        Config.Retriever.USE_RERANKER and not args.no_reranker
+    )
+    Config.Cache.ANSWERS = Config.Cache.ANSWERS and not args.no_answer_cache
+    from src.chain import build_chain
+
+    questions = read_questions(args.input)
+    chain = build_chain(args.documents)
+    output = args.output.open("w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = asyncio.run(run(chain, questions, args.concurrency, output))
+    finally:
+        if args.output:
+            output.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, indent=2))
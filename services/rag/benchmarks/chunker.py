@@ -0,0 +1,107 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from langchain_community.document_loaders import PyPDFium2Loader
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_experimental.text_splitter import SemanticChunker
+
+from src.chunker import FastSemanticChunker
+from src.config import Config
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare SemanticChunker and FastSemanticChunker throughput"
+    )
+    parser.add_argument(
+        "--pdf",
+        type=Path,
+        nargs="+",
+        default=[Config.Path.APP_HOME / "tmp" / "transformers.pdf"],
+        help="PDF files used as input text",
+    )
+    parser.add_argument(
+        "--copies", type=int, default=10, help="Times each PDF text is repeated"
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="Use deterministic fake embeddings to measure splitter overhead only",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def load_texts(pdf_paths, copies):
+    texts = []
+    for pdf_path in pdf_paths:
+        text = "\n".join(
+            page.page_content for page in PyPDFium2Loader(pdf_path).lazy_load()
+        )
+        # Vary each copy so no layer below can serve a repeated text from a cache.
+        texts.extend(f"Copy {i}. {text}" for i in range(copies))
+    return texts
+
+
+def run(name, split_texts, texts):
+    start = time.perf_counter()
+    chunks = split_texts(texts)
+    elapsed = time.perf_counter() - start
+    return chunks, {
+        "splitter": name,
+        "seconds": round(elapsed, 3),
+        "texts_per_second": round(len(texts) / elapsed, 2),
+        "mb_per_second": round(sum(map(len, texts)) / elapsed / 1e6, 3),
+        "chunks": sum(map(len, chunks)),
+    }
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.fake_embeddings:
+        embeddings: Embeddings = DeterministicFakeEmbedding(size=768)
+    else:
+        from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+
+        embeddings = FastEmbedEmbeddings(model_name=Config.Model.EMBEDDINGS)
+    texts = load_texts(args.pdf, args.copies)
+
+    semantic_chunker = SemanticChunker(
+        embeddings, breakpoint_threshold_type="interquartile"
+    )
+    baseline_chunks, baseline = run(
+        "semantic",
+        lambda texts: [semantic_chunker.split_text(text) for text in texts],
+        texts,
+    )
+    fast_chunks, fast = run(
+        "fast",
+        FastSemanticChunker(
+            embeddings,
+            breakpoint_threshold_type="interquartile",
+            batch_size=Config.Ingestor.EMBEDDING_BATCH_SIZE,
+        ).split_texts,
+        texts,
+    )
+    _, fast_capped = run(
+        "fast_capped",
+        FastSemanticChunker(
+            embeddings,
+            breakpoint_threshold_type="interquartile",
+            batch_size=Config.Ingestor.EMBEDDING_BATCH_SIZE,
+            max_window_chars=Config.Ingestor.MAX_WINDOW_CHARS,
+        ).split_texts,
+        texts,
+    )
+    results = {
+        "texts": len(texts),
+        "characters": sum(map(len, texts)),
+        "same_chunks": baseline_chunks == fast_chunks,
+        "speedup": round(baseline["seconds"] / fast["seconds"], 2),
+        "runs": [baseline, fast, fast_capped],
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
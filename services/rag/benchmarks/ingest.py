@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.pdfgen import write_pdf
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Ingestion pipeline benchmark")
+    parser.add_argument("--files", type=int, default=10, help="Number of PDFs")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF")
+    parser.add_argument(
+        "--words-per-page", type=int, default=500, help="Words written on each page"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Parse/chunk worker processes"
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="Use deterministic fake embeddings (forces --workers 1)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="APP_HOME used for the run (defaults to a fresh temporary directory)",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def peak_rss_mb(who: int) -> float:
+    # ru_maxrss is reported in kilobytes on Linux.
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="rag-ingest-bench-"))
+    # Config reads APP_HOME at import time, so it has to be set first.
+    os.environ["APP_HOME"] = str(work_dir)
+    from src.config import Config
+    from src.ingestor import Ingestor
+
+    Config.Path.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    doc_paths = []
+    for i in range(args.files):
+        doc_path = Config.Path.DOCUMENTS_DIR / f"bench-{i:04d}.pdf"
+        write_pdf(doc_path, args.pages, args.words_per_page, seed=i)
+        doc_paths.append(doc_path)
+
+    embeddings = None
+    workers = args.workers
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=768)
+        workers = 1
+
+    ingestor = Ingestor(workers=workers, embeddings=embeddings)
+    start = time.perf_counter()
+    ingestor.ingest(doc_paths)
+    elapsed = time.perf_counter() - start
+
+    results = {
+        "files": args.files,
+        "pages": args.files * args.pages,
+        "words_per_page": args.words_per_page,
+        "workers": workers,
+        "chunker": Config.Ingestor.CHUNKER,
+        "fake_embeddings": args.fake_embeddings,
+        "total_seconds": round(elapsed, 3),
+        "stages": ingestor.stats.as_dict(),
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        # The largest single worker process, not the sum over all of them.
+        "peak_rss_largest_worker_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
@@ -0,0 +1,99 @@
+import random
+import textwrap
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TOPICS = {
+    "astronomy": "star galaxy orbit telescope nebula planet comet gravity light spectrum "
+    "cluster supernova moon solar eclipse cosmic radiation horizon",
+    "cooking": "flour butter oven recipe garlic simmer spice onion sauce knife pan "
+    "bread roast salt pepper dough kitchen",
+    "finance": "market interest loan equity bond budget revenue invoice dividend asset "
+    "inflation currency credit audit portfolio tax",
+    "networking": "router packet latency protocol socket bandwidth switch firewall "
+    "address routing cable server client frame header gateway",
+    "biology": "cell protein enzyme membrane gene tissue organism species mutation "
+    "nucleus bacteria virus evolution habitat molecule",
+}
+
+LINES_PER_PAGE = 60
+CHARS_PER_LINE = 95
+
+
+def make_paragraphs(rng: random.Random, words: int) -> List[str]:
+    """Paragraphs of random sentences, each paragraph drawn from one topic."""
+    paragraphs = []
+    while words > 0:
+        vocabulary = TOPICS[rng.choice(sorted(TOPICS))].split()
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            length = rng.randint(6, 16)
+            sentence = " ".join(rng.choice(vocabulary) for _ in range(length))
+            sentences.append(sentence.capitalize() + ".")
+            words -= length
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(
+    path: Path,
+    pages: int,
+    words_per_page: int,
+    seed: int = 0,
+    facts: Optional[Dict[int, List[str]]] = None,
+) -> None:
+    """Writes a text-only PDF (Helvetica, US Letter) without any PDF library.
+
+    ``facts`` maps page numbers to sentences printed as the first paragraphs
+    of that page, so their text is known to be in the document.
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        lines = []
+        page_facts = (facts or {}).get(page, [])
+        for paragraph in page_facts + make_paragraphs(rng, words_per_page):
+            lines.extend(textwrap.wrap(paragraph, CHARS_PER_LINE))
+            lines.append("")
+        lines = lines[:LINES_PER_PAGE]
+        content = (
+            "BT /F1 10 Tf 12 TL 50 750 Td "
+            + " ".join(f"({_escape(line)}) Tj T*" for line in lines)
+            + " ET"
+        )
+        stream = content.encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(page_refs),
+        pages,
+    )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    path.write_bytes(bytes(output))
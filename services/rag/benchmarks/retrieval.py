@@ -0,0 +1,205 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from benchmarks.pdfgen import write_pdf
+from src.stats import percentile
+
+ATTRIBUTES = ["code name", "home port", "chief engineer", "access key", "call sign"]
+KINDS = ["station", "vessel", "protocol", "reactor", "archive", "expedition"]
+SYLLABLES = "ka lo ve mi tra zu sen dor bel qui nax fen rho tam gil".split()
+
+
+class Question(NamedTuple):
+    question: str
+    answer: str
+    source: str
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Retrieval quality and latency across retriever configurations"
+    )
+    parser.add_argument("--files", type=int, default=5, help="Number of PDFs")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per PDF")
+    parser.add_argument(
+        "--words-per-page", type=int, default=400, help="Words written on each page"
+    )
+    parser.add_argument(
+        "--facts-per-file", type=int, default=10, help="Planted facts (questions)"
+    )
+    parser.add_argument("--modes", default="dense,hybrid", help="Retriever.MODE values")
+    parser.add_argument(
+        "--rerankers", default="off,on", help="Retriever.USE_RERANKER values"
+    )
+    parser.add_argument(
+        "--filters",
+        default="off",
+        help="Retriever.USE_CHAIN_FILTER values ('on' calls the configured LLM)",
+    )
+    parser.add_argument("--k", default="1,3,5,10", help="Retriever.K values")
+    parser.add_argument(
+        "--fetch-k",
+        default="0",
+        help="Candidates retrieved for the reranker to cut down to k (0: just k)",
+    )
+    parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.9,
+        help="Recommend the fastest configuration reaching this recall@k",
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="Use deterministic fake embeddings",
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="APP_HOME used for the run (defaults to a fresh temporary directory)",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(3))
+
+
+def make_facts(
+    files: int, pages: int, facts_per_file: int, seed: int = 0
+) -> Tuple[Dict[int, Dict[int, List[str]]], List[Question]]:
+    """Plants one made-up fact per question on a random page of each file.
+
+    Every answer is a unique invented token, so a retrieved chunk is relevant
+    exactly when its text contains the answer.
+    """
+    rng = random.Random(seed)
+    facts, questions = {}, []
+    for i in range(files):
+        facts[i] = {}
+        for _ in range(facts_per_file):
+            attribute = rng.choice(ATTRIBUTES)
+            entity = f"{make_word(rng).capitalize()} {rng.choice(KINDS)}"
+            answer = f"{make_word(rng).capitalize()}{rng.randint(100, 999)}"
+            facts[i].setdefault(rng.randrange(pages), []).append(
+                f"The {attribute} of the {entity} is {answer}."
+            )
+            questions.append(
+                Question(
+                    f"What is the {attribute} of the {entity}?",
+                    answer,
+                    f"bench-{i:04d}.pdf",
+                )
+            )
+    return facts, questions
+
+
+def evaluate(retriever, questions: List[Question], k: int) -> Dict:
+    retriever.invoke(questions[0].question)  # warm up
+    latencies, reciprocal_ranks = [], []
+    cpu_start = time.process_time()
+    for question in questions:
+        start = time.perf_counter()
+        documents = retriever.invoke(question.question)[:k]
+        latencies.append(time.perf_counter() - start)
+        rank = next(
+            (
+                rank
+                for rank, document in enumerate(documents, start=1)
+                if question.answer in document.page_content
+            ),
+            None,
+        )
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    cpu_seconds = time.process_time() - cpu_start
+    return {
+        "recall": round(sum(rr > 0 for rr in reciprocal_ranks) / len(questions), 3),
+        "mrr": round(sum(reciprocal_ranks) / len(questions), 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "cpu_ms_per_query": round(cpu_seconds / len(questions) * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="rag-quality-bench-"))
+    # Config reads APP_HOME at import time, so it has to be set first.
+    os.environ["APP_HOME"] = str(work_dir)
+    from src.config import Config
+    from src.ingestor import Ingestor
+    from src.retriever import create_retriever
+
+    facts, questions = make_facts(args.files, args.pages, args.facts_per_file)
+    Config.Path.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    doc_paths = []
+    for i in range(args.files):
+        doc_path = Config.Path.DOCUMENTS_DIR / f"bench-{i:04d}.pdf"
+        write_pdf(doc_path, args.pages, args.words_per_page, seed=i, facts=facts[i])
+        doc_paths.append(doc_path)
+
+    embeddings = None
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=768)
+    vector_store = Ingestor(embeddings=embeddings).ingest(doc_paths)
+
+    rows, seen = [], set()
+    hybrid_fetch_k = Config.Retriever.HYBRID_FETCH_K
+    for mode, reranker, chain_filter, k, fetch_k in itertools.product(
+        args.modes.split(","),
+        args.rerankers.split(","),
+        args.filters.split(","),
+        [int(k) for k in args.k.split(",")],
+        [int(fetch_k) for fetch_k in args.fetch_k.split(",")],
+    ):
+        # Without a reranker the extra candidates would just be cut off again.
+        fetch_k = max(k, fetch_k) if reranker == "on" else k
+        if (mode, reranker, chain_filter, k, fetch_k) in seen:
+            continue
+        seen.add((mode, reranker, chain_filter, k, fetch_k))
+        Config.Retriever.MODE = mode
+        Config.Retriever.USE_RERANKER = reranker == "on"
+        Config.Retriever.USE_CHAIN_FILTER = chain_filter == "on"
+        Config.Retriever.K = fetch_k
+        Config.Retriever.HYBRID_FETCH_K = max(hybrid_fetch_k, fetch_k)
+        llm = None
+        if Config.Retriever.USE_CHAIN_FILTER:
+            from src.model import create_llm
+
+            llm = create_llm()
+        retriever = create_retriever(llm, vector_store=vector_store)
+        if retriever.reranker is not None:
+            # The reranker keeps its own top_n (3 by default); let it return k.
+            getattr(retriever.reranker, "reranker", retriever.reranker).top_n = k
+        row = {
+            "mode": mode,
+            "reranker": reranker,
+            "filter": chain_filter,
+            "k": k,
+            "fetch_k": fetch_k,
+        }
+        row.update(evaluate(retriever, questions, k))
+        rows.append(row)
+        print(json.dumps(row))
+
+    passing = [row for row in rows if row["recall"] >= args.target_recall]
+    results = {
+        "backend": Config.Database.BACKEND,
+        "questions": len(questions),
+        "target_recall": args.target_recall,
+        "recommended": min(passing, key=lambda row: row["p50_ms"], default=None),
+        "configurations": rows,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.pdfgen import TOPICS, write_pdf
+from src.stats import percentile
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Concurrent retrieval load test")
+    parser.add_argument("--files", type=int, default=5, help="Number of PDFs")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF")
+    parser.add_argument(
+        "--words-per-page", type=int, default=500, help="Words written on each page"
+    )
+    parser.add_argument(
+        "--questions", type=int, default=64, help="Questions per concurrency level"
+    )
+    parser.add_argument(
+        "--concurrency",
+        default="1,8,32",
+        help="Comma-separated numbers of questions in flight",
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="Use deterministic fake embeddings",
+    )
+    parser.add_argument(
+        "--no-reranker", action="store_true", help="Disable the FlashRank reranker"
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="APP_HOME used for the run (defaults to a fresh temporary directory)",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def make_questions(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = " ".join(TOPICS.values()).split()
+    return [" ".join(rng.sample(vocabulary, 4)) + "?" for _ in range(count)]
+
+
+async def run_level(retriever, questions: List[str], concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def ask(question: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await retriever.ainvoke(question)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(question) for question in questions))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "questions": len(questions),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "questions_per_second": round(len(questions) / elapsed, 2),
+    }
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="rag-retrieval-bench-"))
+    # Config reads APP_HOME at import time, so it has to be set first.
+    os.environ["APP_HOME"] = str(work_dir)
+    from src.config import Config
+    from src.ingestor import Ingestor
+    from src.retriever import create_retriever
+
+    Config.Retriever.USE_RERANKER = not args.no_reranker
+    Config.Retriever.USE_CHAIN_FILTER = False
+    Config.Path.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    doc_paths = []
+    for i in range(args.files):
+        doc_path = Config.Path.DOCUMENTS_DIR / f"bench-{i:04d}.pdf"
+        write_pdf(doc_path, args.pages, args.words_per_page, seed=i)
+        doc_paths.append(doc_path)
+
+    embeddings = None
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=768)
+    vector_store = Ingestor(embeddings=embeddings).ingest(doc_paths)
+    retriever = create_retriever(None, vector_store=vector_store)
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = {
+        "backend": Config.Database.BACKEND,
+        "mode": Config.Retriever.MODE,
+        "reranker": Config.Retriever.USE_RERANKER,
+        "search_concurrency": Config.Retriever.SEARCH_CONCURRENCY,
+        "rerank_concurrency": Config.Retriever.RERANK_CONCURRENCY,
+        "levels": [
+            asyncio.run(
+                run_level(retriever, make_questions(args.questions, seed), level)
+            )
+            for seed, level in enumerate(levels)
+        ],
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
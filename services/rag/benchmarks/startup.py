@@ -0,0 +1,90 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent.parent
+
+HEAVY_MODULES = [
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_experimental",
+    "langchain_qdrant",
+    "langchain_groq",
+    "qdrant_client",
+    "fastembed",
+    "onnxruntime",
+    "flashrank",
+    "groq",
+]
+
+# Runs in a fresh interpreter so the first script run is a real cold start.
+CHILD_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+from src.config import Config
+
+Config.Model.WARM_UP = False
+app = AppTest.from_file("app.py", default_timeout=120)
+start = time.perf_counter()
+app.run()
+cold = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+heavy = sorted(name for name in json.loads(sys.argv[1]) if name in sys.modules)
+print(json.dumps({"cold_ms": cold * 1000, "rerun_ms": rerun * 1000, "heavy": heavy}))
+"""
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Cold-start and rerun time of the Streamlit app's upload screen"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to use")
+    parser.add_argument(
+        "--budget-cold-ms", type=float, default=1500, help="Budget for the first run"
+    )
+    parser.add_argument(
+        "--budget-rerun-ms", type=float, default=300, help="Budget for a rerun"
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def measure_once():
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, json.dumps(HEAVY_MODULES)],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    runs = [measure_once() for _ in range(args.runs)]
+    cold_ms = statistics.median(run["cold_ms"] for run in runs)
+    rerun_ms = statistics.median(run["rerun_ms"] for run in runs)
+    heavy = sorted({name for run in runs for name in run["heavy"]})
+    results = {
+        "cold_ms": round(cold_ms, 1),
+        "rerun_ms": round(rerun_ms, 1),
+        "budget_cold_ms": args.budget_cold_ms,
+        "budget_rerun_ms": args.budget_rerun_ms,
+        "heavy_modules_loaded": heavy,
+        "within_budget": (
+            cold_ms <= args.budget_cold_ms
+            and rerun_ms <= args.budget_rerun_ms
+            and not heavy
+        ),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    sys.exit(0 if results["within_budget"] else 1)
@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from src.config import Config
+
+load_dotenv()
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def serialize_documents(documents) -> list:
+    return [
+        {"content": document.page_content, "metadata": document.metadata}
+        for document in documents
+    ]
+
+
+class RagServer:
+    """ASGI app answering questions over one shared chain.
+
+    ``POST /ask`` takes ``{"question": ..., "session_id": ...}`` and streams
+    ``sources``, ``token``, ``timings`` and ``done`` Server-Sent Events, or
+    returns one JSON object when ``"stream": false``. At most
+    ``max_concurrency`` questions run at once; once ``max_queue`` more are
+    waiting, new ones get 503.
+    """
+
+    def __init__(
+        self,
+        chain_factory: Optional[Callable[[], Any]] = None,
+        max_concurrency: int = Config.Server.MAX_CONCURRENCY,
+        max_queue: int = Config.Server.MAX_QUEUE,
+    ) -> None:
+        self.chain_factory = chain_factory
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.chain = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.chain_factory is None:
+            from src.chain import build_chain
+
+            self.chain_factory = build_chain
+        # Building the chain loads models and opens the store; keep the loop free.
+        self.chain = await asyncio.to_thread(self.chain_factory)
+
+    async def http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = (scope["method"], scope["path"])
+        if route == ("GET", "/health"):
+            status = "ok" if self.chain is not None else "starting"
+            await self.send_json(send, 200, {"status": status, "waiting": self.waiting})
+        elif route == ("POST", "/ask"):
+            await self.ask(receive, send)
+        else:
+            await self.send_json(send, 404, {"error": "not found"})
+
+    async def ask(self, receive: Receive, send: Send) -> None:
+        try:
+            request = json.loads(await self.read_body(receive) or b"{}")
+            question = str(request["question"]).strip()
+        except (ValueError, KeyError, TypeError):
+            await self.send_json(send, 400, {"error": 'expected {"question": ...}'})
+            return
+        if not question:
+            await self.send_json(send, 400, {"error": "empty question"})
+            return
+        if self.chain is None:
+            await self.send_json(send, 503, {"error": "starting"})
+            return
+        if self.semaphore.locked() and self.waiting >= self.max_queue:
+            await self.send_json(send, 503, {"error": "too many requests"})
+            return
+
+        session_id = str(request.get("session_id") or uuid.uuid4())
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            if request.get("stream", True):
+                await self.stream_answer(question, session_id, receive, send)
+            else:
+                await self.send_json(send, 200, await self.answer(question, session_id))
+        finally:
+            self.semaphore.release()
+
+    async def answer(self, question: str, session_id: str) -> dict:
+        from src.chain import ask_question
+
+        answer, sources, timings = [], [], {}
+        async for event in ask_question(self.chain, question, session_id):
+            if type(event) is str:
+                answer.append(event)
+            elif type(event) is list:
+                sources.extend(serialize_documents(event))
+            elif type(event) is dict:
+                timings = event
+        return {
+            "session_id": session_id,
+            "answer": "".join(answer),
+            "sources": sources,
+            "timings": timings,
+        }
+
+    async def stream_answer(
+        self, question: str, session_id: str, receive: Receive, send: Send
+    ) -> None:
+        from src.chain import ask_question
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-session-id", session_id.encode("utf-8")),
+                ],
+            }
+        )
+        disconnected = asyncio.create_task(self.wait_for_disconnect(receive))
+        try:
+            async for event in ask_question(self.chain, question, session_id):
+                if disconnected.done():
+                    return
+                if type(event) is str:
+                    message = format_sse("token", {"text": event})
+                elif type(event) is list:
+                    message = format_sse("sources", serialize_documents(event))
+                else:
+                    message = format_sse("timings", event)
+                await send(
+                    {"type": "http.response.body", "body": message, "more_body": True}
+                )
+            body = format_sse("done", {"session_id": session_id})
+        except Exception as e:
+            body = format_sse("error", {"error": str(e)})
+        finally:
+            disconnected.cancel()
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+    @staticmethod
+    async def wait_for_disconnect(receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def read_body(receive: Receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    @staticmethod
+    async def send_json(send: Send, status: int, payload: dict) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send(
+            {"type": "http.response.body", "body": json.dumps(payload).encode("utf-8")}
+        )
+
+
+app = RagServer()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="RAG query service")
+    parser.add_argument("--host", default=Config.Server.HOST)
+    parser.add_argument("--port", type=int, default=Config.Server.PORT)
+    parser.add_argument(
+        "--documents",
+        type=Path,
+        help="Ingest the PDFs in this directory before serving "
+        "(otherwise the existing collection is used)",
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, default=Config.Server.MAX_CONCURRENCY
+    )
+    parser.add_argument("--max-queue", type=int, default=Config.Server.MAX_QUEUE)
+    parser.add_argument(
+        "--fake-llm",
+        action="store_true",
+        help="Answer with a canned local model, so no LLM API is needed",
+    )
+    parser.add_argument(
+        "--no-reranker", action="store_true", help="Disable the FlashRank reranker"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_arguments()
+    Config.Model.USE_FAKE = args.fake_llm or Config.Model.USE_FAKE
+    Config.Retriever.USE_RERANKER = (
+        Config.Retriever.USE_RERANKER and not args.no_reranker
+    )
+    from src.chain import build_chain
+
+    server = RagServer(
+        chain_factory=lambda: build_chain(args.documents),
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+    )
+    uvicorn.run(server, host=args.host, port=args.port)
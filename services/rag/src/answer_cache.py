@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class CachedAnswer(NamedTuple):
+    vector: np.ndarray
+    answer: str
+    documents: List[Document]
+    created: float
+
+
+class AnswerCache:
+    """Answers keyed by question embedding, valid for one collection version.
+
+    A lookup hits when the cosine similarity to a stored question reaches
+    ``threshold``. Entries expire after ``ttl_seconds``, the least recently used
+    are evicted beyond ``max_entries`` and everything is dropped as soon as
+    ``version_fn`` reports a different collection version.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        version_fn: Callable[[], str],
+        threshold: float,
+        ttl_seconds: float,
+        max_entries: int,
+    ) -> None:
+        self.embeddings = embeddings
+        self.version_fn = version_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self.version: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _expire(self) -> None:
+        version = self.version_fn()
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+        deadline = time.monotonic() - self.ttl_seconds
+        for key in [
+            key for key, entry in self.entries.items() if entry.created < deadline
+        ]:
+            del self.entries[key]
+
+    def lookup(self, question: str) -> Optional[Tuple[str, List[Document]]]:
+        vector = self._embed(question)
+        with self.lock:
+            self._expire()
+            if not self.entries:
+                return None
+            keys = list(self.entries)
+            similarities = (
+                np.stack([entry.vector for entry in self.entries.values()]) @ vector
+            )
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            self.entries.move_to_end(keys[best])
+            entry = self.entries[keys[best]]
+            return entry.answer, entry.documents
+
+    def store(
+        self, question: str, answer: str, documents: List[Document], version: str
+    ) -> None:
+        vector = self._embed(question)
+        with self.lock:
+            self._expire()
+            if version != self.version:
+                return
+            self.entries[question] = CachedAnswer(
+                vector, answer, documents, time.monotonic()
+            )
+            self.entries.move_to_end(question)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -0,0 +1,226 @@
+import itertools
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import numpy as np
+from langchain_community.document_compressors.flashrank_rerank import FlashrankRerank
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.embeddings import Embeddings
+from pydantic import ConfigDict
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_batchers: Dict[str, "MicroBatcher"] = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesces concurrent single-item calls into batched calls.
+
+    Callers block in ``submit`` while a background thread collects requests for
+    up to ``max_wait_ms`` or ``max_batch_size`` items, runs ``fn`` once on the
+    whole batch and hands every caller its own result. Each instance reports
+    its metrics under its own key: ``name``, then ``name-2``, ``name-3``...
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[List[T]], List[R]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 3.0,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_sizes: Counter = Counter()
+        self._queue: "queue.Queue[Tuple[T, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        with _batchers_lock:
+            self.key = name
+            for n in itertools.count(2):
+                if self.key not in _batchers:
+                    break
+                self.key = f"{name}-{n}"
+            _batchers[self.key] = self
+
+    def submit(self, item: T) -> R:
+        return self.submit_future(item).result()
+
+    def submit_future(self, item: T) -> Future:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"batcher-{self.name}", daemon=True
+                )
+                self._thread.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> List[Tuple[T, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            with self._lock:
+                self.batch_sizes[len(batch)] += 1
+            try:
+                results = self.fn([item for item, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+        batches = sum(sizes.values())
+        items = sum(size * count for size, count in sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_sizes": {str(size): count for size, count in sizes.items()},
+        }
+
+
+def batching_metrics() -> Dict[str, dict]:
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {key: batcher.metrics() for key, batcher in batchers.items()}
+
+
+class BatchedQueryEmbeddings(Embeddings):
+    """Embeds concurrent queries together; documents are passed through."""
+
+    def __init__(
+        self, embeddings: Embeddings, max_batch_size: int, max_wait_ms: float
+    ) -> None:
+        self.embeddings = embeddings
+        self.batcher = MicroBatcher(
+            "query_embeddings", self._embed_queries, max_batch_size, max_wait_ms
+        )
+
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        model = getattr(self.embeddings, "model", None)
+        if hasattr(model, "query_embed"):
+            return [vector.tolist() for vector in model.query_embed(texts)]
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit(text)
+
+
+class BatchedReranker(BaseDocumentCompressor):
+    """``FlashrankRerank`` that scores concurrent questions in one ONNX run."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    reranker: FlashrankRerank
+    batcher: Any = None
+
+    def __init__(self, **kwargs: Any) -> None:
+        max_batch_size = kwargs.pop("max_batch_size", 32)
+        max_wait_ms = kwargs.pop("max_wait_ms", 3.0)
+        super().__init__(**kwargs)
+        self.batcher = MicroBatcher(
+            "reranker", self._score, max_batch_size, max_wait_ms
+        )
+
+    def _score(self, requests: List[Tuple[str, List[str]]]) -> List[np.ndarray]:
+        ranker = self.reranker.client
+        if ranker.llm_model is not None:
+            # Listwise LLM rankers only return an order, so score one by one.
+            return [self._score_one(ranker, query, texts) for query, texts in requests]
+        pairs = [[query, text] for query, texts in requests for text in texts]
+        encoded = ranker.tokenizer.encode_batch(pairs)
+        onnx_input = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encoded], dtype=np.int64
+            ),
+        }
+        token_type_ids = np.array([e.type_ids for e in encoded], dtype=np.int64)
+        if np.any(token_type_ids):
+            onnx_input["token_type_ids"] = token_type_ids
+        logits = ranker.session.run(None, onnx_input)[0]
+        if logits.shape[1] == 1:
+            scores = 1 / (1 + np.exp(-logits.flatten()))
+        else:
+            exp_logits = np.exp(logits)
+            scores = exp_logits[:, 1] / np.sum(exp_logits, axis=1)
+        bounds = np.cumsum([len(texts) for _, texts in requests])[:-1]
+        return np.split(scores, bounds)
+
+    @staticmethod
+    def _score_one(ranker: Any, query: str, texts: List[str]) -> np.ndarray:
+        from flashrank import RerankRequest
+
+        passages = [{"id": i, "text": text} for i, text in enumerate(texts)]
+        scores = np.zeros(len(texts))
+        for rank, passage in enumerate(
+            ranker.rerank(RerankRequest(query=query, passages=passages))
+        ):
+            scores[passage["id"]] = passage.get("score", len(texts) - rank)
+        return scores
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        scores = self.batcher.submit(
+            (query, [document.page_content for document in documents])
+        )
+        prefix = self.reranker.prefix_metadata
+        order = np.argsort(-np.asarray(scores), kind="stable")[: self.reranker.top_n]
+        return [
+            Document(
+                page_content=documents[i].page_content,
+                metadata={
+                    prefix + "id": int(i),
+                    prefix + "relevance_score": float(scores[i]),
+                    **documents[i].metadata,
+                },
+            )
+            for i in order
+            if scores[i] >= self.reranker.score_threshold
+        ]
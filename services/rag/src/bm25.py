@@ -0,0 +1,112 @@
+import heapq
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 inverted index persisted in SQLite.
+
+    Each batch is added in one SQLite transaction of its own, after the vector
+    store upsert and before the manifest records the batch. Nothing spans the
+    two stores: a crash in between leaves the batch out of the manifest, so the
+    next ingest adds it again, and ``add`` replaces postings of existing ids.
+    """
+
+    def __init__(self, path: Path, k1: float = 1.5, b: float = 0.75) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY, content TEXT, metadata TEXT, length INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT, id TEXT, tf INTEGER, PRIMARY KEY (term, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_id ON postings (id);
+            """)
+
+    def add(self, ids: List[str], documents: List[Document]) -> None:
+        with self.lock, self.connection:
+            self._remove(ids)
+            for doc_id, document in zip(ids, documents):
+                terms = Counter(tokenize(document.page_content))
+                self.connection.execute(
+                    "INSERT INTO documents VALUES (?, ?, ?, ?)",
+                    (
+                        doc_id,
+                        document.page_content,
+                        json.dumps(document.metadata),
+                        sum(terms.values()),
+                    ),
+                )
+                self.connection.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in terms.items()],
+                )
+
+    def remove(self, ids: List[str]) -> None:
+        with self.lock, self.connection:
+            self._remove(ids)
+
+    def _remove(self, ids: List[str]) -> None:
+        rows = [(doc_id,) for doc_id in ids]
+        self.connection.executemany("DELETE FROM documents WHERE id = ?", rows)
+        self.connection.executemany("DELETE FROM postings WHERE id = ?", rows)
+
+    def clear(self) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM documents")
+            self.connection.execute("DELETE FROM postings")
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        terms = set(tokenize(query))
+        with self.lock:
+            count, average_length = self.connection.execute(
+                "SELECT COUNT(*), AVG(length) FROM documents"
+            ).fetchone()
+            if not count or not terms:
+                return []
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self.connection.execute(
+                    "SELECT p.id, p.tf, d.length FROM postings p "
+                    "JOIN documents d ON d.id = p.id WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for doc_id, tf, length in postings:
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    score = idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            results = []
+            for doc_id, score in top:
+                content, metadata = self.connection.execute(
+                    "SELECT content, metadata FROM documents WHERE id = ?", (doc_id,)
+                ).fetchone()
+                metadata = {**json.loads(metadata), "_id": doc_id}
+                results.append(
+                    (Document(page_content=content, metadata=metadata), score)
+                )
+            return results
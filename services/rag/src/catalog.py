@@ -0,0 +1,198 @@
+import hashlib
+import json
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .config import Config
+
+
+def collection_id(digests: Dict[str, str]) -> str:
+    """Names a collection after the names and content hashes of its files."""
+    digest = hashlib.sha256()
+    for file_name, file_digest in sorted(digests.items()):
+        digest.update(f"{file_name}\0{file_digest}\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def directory_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class CollectionCatalog:
+    """Collections of uploaded file sets, stored side by side under ``root``.
+
+    Every collection has its own directory (vector store, BM25 index and
+    manifest) named by ``collection_id``, so the same files always map to the
+    same collection and different uploads never overwrite each other.
+    ``catalog.json`` records which collections are fully ingested, their files,
+    size on disk and last use. Once they and the stored uploads in
+    ``documents_dir`` take more than ``max_bytes``, the least recently used
+    collections are deleted, except those opened by this process, along with
+    the uploads no other collection refers to. An upload is kept for
+    ``grace_seconds`` after it was last stored, since it may belong to a session
+    that has not opened its collection yet.
+
+    A new collection starts as a copy of the ready one sharing the most files
+    with it, so the manifest only lets the ingestor parse and embed the files
+    that are new; adding one PDF to a large set costs one PDF's worth of work.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        documents_dir: Optional[Path] = None,
+        grace_seconds: float = 3600,
+    ) -> None:
+        self.root = root
+        self.documents_dir = documents_dir
+        self.grace_seconds = grace_seconds
+        self.path = root / Config.Database.CATALOG_FILE
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.in_use: Set[str] = set()
+        self.seeding: Set[str] = set()
+        self.entries: Dict[str, dict] = (
+            json.loads(self.path.read_text()) if self.path.exists() else {}
+        )
+
+    def open(self, collection: str, files: Dict[str, str]) -> Path:
+        """Marks ``collection`` of ``files`` (name to content hash) as used now.
+
+        Returns the directory to ingest into or open the collection from.
+        """
+        directory = self.root / collection
+        with self.lock:
+            self.in_use.add(collection)
+            entry = self.entries.setdefault(
+                collection, {"ready": False, "size_bytes": 0}
+            )
+            entry["files"] = dict(sorted(files.items()))
+            entry["last_used"] = time.time()
+            self._save()
+            source = None
+            if not entry["ready"] and not directory.exists():
+                source = self._closest(collection, files)
+                if source is not None:
+                    self.seeding.add(source)
+        if source is not None:
+            try:
+                self._seed(directory, self.root / source)
+            finally:
+                with self.lock:
+                    self.seeding.discard(source)
+        return directory
+
+    def _closest(self, collection: str, files: Dict[str, str]) -> Optional[str]:
+        """The ready collection sharing the most (name, content) pairs with files."""
+        wanted = set(files.items())
+        best, best_key = None, (0, 0.0)
+        for other, entry in self.entries.items():
+            if other == collection or not entry["ready"]:
+                continue
+            key = (len(wanted & set(entry["files"].items())), entry["last_used"])
+            if key[0] and key > best_key and (self.root / other).exists():
+                best, best_key = other, key
+        return best
+
+    @staticmethod
+    def _seed(directory: Path, source: Path) -> None:
+        # Copied under a temporary name, so a half-copied directory is never
+        # taken for a collection; another session may have seeded it already.
+        tmp_directory = directory.with_name(f"{directory.name}.{uuid.uuid4().hex}")
+        shutil.copytree(source, tmp_directory, ignore=shutil.ignore_patterns(".lock"))
+        try:
+            tmp_directory.rename(directory)
+        except OSError:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+
+    def is_ready(self, collection: str) -> bool:
+        with self.lock:
+            return self.entries.get(collection, {}).get("ready", False)
+
+    def mark_ready(self, collection: str) -> None:
+        size = directory_size(self.root / collection)
+        with self.lock:
+            self.entries[collection].update(ready=True, size_bytes=size)
+            self._save()
+
+    def _uploads(self) -> Dict[str, Tuple[int, float]]:
+        """Size and last modification of every stored upload, by digest."""
+        uploads: Dict[str, Tuple[int, float]] = {}
+        if self.documents_dir is None or not self.documents_dir.exists():
+            return uploads
+        for path in self.documents_dir.iterdir():
+            if path.is_dir() and re.fullmatch(r"[0-9a-f]{64}", path.name):
+                # File names are hard links to one blob, so count each inode once.
+                inodes = {p.stat().st_ino: p.stat().st_size for p in path.iterdir()}
+                uploads[path.name] = (sum(inodes.values()), path.stat().st_mtime)
+        return uploads
+
+    def collect_garbage(self) -> List[str]:
+        """Deletes least recently used collections until the rest fit the budget.
+
+        Uploads no remaining collection refers to are deleted once they were not
+        stored again for ``grace_seconds``.
+        """
+        with self.lock:
+            for collection, entry in self.entries.items():
+                entry["size_bytes"] = directory_size(self.root / collection)
+            uploads = self._uploads()
+            references: Dict[str, int] = {}
+            for entry in self.entries.values():
+                for digest in set(entry["files"].values()):
+                    references[digest] = references.get(digest, 0) + 1
+            total = sum(entry["size_bytes"] for entry in self.entries.values())
+            total += sum(size for size, _ in uploads.values())
+            deadline = time.time() - self.grace_seconds
+            removed = []
+            for collection, entry in sorted(
+                self.entries.items(), key=lambda item: item[1]["last_used"]
+            ):
+                if total <= self.max_bytes:
+                    break
+                if collection in self.in_use or collection in self.seeding:
+                    continue
+                shutil.rmtree(self.root / collection, ignore_errors=True)
+                total -= entry["size_bytes"]
+                for digest in set(entry["files"].values()):
+                    references[digest] -= 1
+                    if not references[digest] and digest in uploads:
+                        size, modified = uploads[digest]
+                        total -= size if modified < deadline else 0
+                removed.append(collection)
+            for collection in removed:
+                del self.entries[collection]
+            for digest, (_, modified) in uploads.items():
+                if not references.get(digest) and modified < deadline:
+                    shutil.rmtree(self.documents_dir / digest, ignore_errors=True)
+            self._save()
+            return removed
+
+    def _save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries, indent=2))
+        tmp_path.replace(self.path)
+
+
+_catalog: Optional[CollectionCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CollectionCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = CollectionCatalog(
+                Config.Path.COLLECTIONS_DIR,
+                max_bytes=Config.Database.MAX_DISK_BYTES,
+                documents_dir=Config.Path.DOCUMENTS_DIR,
+                grace_seconds=Config.Database.UPLOAD_GRACE_SECONDS,
+            )
+        return _catalog
@@ -1,19 +1,28 @@
 import re
+import uuid
 from operator import itemgetter
-from typing import List
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional
  
 from langchain.schema.runnable import RunnablePassthrough
+from langchain_core.callbacks.manager import dispatch_custom_event
 from langchain_core.documents import Document
+from langchain_core.messages import AIMessageChunk
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import Runnable
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import run_in_executor
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.tracers.stdout import ConsoleCallbackHandler
-from langchain_core.vectorstores import VectorStoreRetriever
  
+from .answer_cache import AnswerCache
 from .config import Config
-from langchain_community.chat_message_histories import ChatMessageHistory
-
+from .context_packer import pack_documents
+from .manifest import collection_version
+from .metrics import RequestTimer, get_metrics, get_profiler
+from .model import create_embeddings, create_llm
+from .retriever import create_retriever
 from .session_history import get_session_history
  
 SYSTEM_PROMPT = """
@@ -34,13 +43,97 @@ def remove_links(text: str) -> str:
     return re.sub(url_pattern, "", text)
  
 def format_documents(documents: List[Document]) -> str:
+    blocks, stats = pack_documents(
+        documents,
+        token_budget=Config.Context.TOKEN_BUDGET,
+        duplicate_similarity=Config.Context.DUPLICATE_SIMILARITY,
+    )
+    try:
+        dispatch_custom_event(
+            "context_packed", {**stats._asdict(), "tokens_saved": stats.tokens_saved}
+        )
+    except RuntimeError:
+        pass  # called outside of a chain run
     texts = []
-    for doc in documents:
-        texts.append(doc.page_content)
+    for block in blocks:
+        texts.append(block)
         texts.append("---")
     return remove_links("\n".join(texts))
 
-def create_chain(llm: BaseLanguageModel, retriever: VectorStoreRetriever) -> Runnable:
+class AnswerCachingChain(Runnable):
+    """Serves repeated questions from an ``AnswerCache`` instead of the chain.
+
+    Only the first question of a session is looked up, since follow-up
+    questions depend on the conversation. A hit replays the stored sources and
+    answer as the same events ``ask_question`` consumes and records the turn in
+    the session history.
+    """
+
+    def __init__(self, chain: Runnable, cache: AnswerCache) -> None:
+        self.chain = chain
+        self.cache = cache
+
+    def invoke(
+        self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Any:
+        return self.chain.invoke(input, config, **kwargs)
+
+    async def astream_events(
+        self, input: dict, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> AsyncIterator[dict]:
+        question = input["question"]
+        history = get_session_history(config["configurable"]["session_id"])
+        if history.messages:
+            async for event in self.chain.astream_events(input, config, **kwargs):
+                yield event
+            return
+
+        version = self.cache.version_fn()
+        # Both embed the question, which must not block the event loop.
+        hit = await run_in_executor(config, self.cache.lookup, question)
+        if hit:
+            answer, documents = hit
+            history.add_user_message(question)
+            history.add_ai_message(answer)
+            yield self._event("on_retriever_end", "context_retriever", output=documents)
+            for token in re.findall(r"\s*\S+\s*", answer):
+                yield self._event(
+                    "on_chain_stream",
+                    "chain_answer",
+                    chunk=AIMessageChunk(content=token),
+                )
+            return
+
+        answer, documents = [], []
+        async for event in self.chain.astream_events(input, config, **kwargs):
+            event_type, name = event["event"], event["name"]
+            if event_type == "on_retriever_end" and name == "context_retriever":
+                documents.extend(event["data"]["output"])
+            if event_type == "on_chain_stream" and name == "chain_answer":
+                answer.append(event["data"]["chunk"].content)
+            yield event
+        await run_in_executor(
+            config, self.cache.store, question, "".join(answer), documents, version
+        )
+
+    @staticmethod
+    def _event(event: str, name: str, **data: Any) -> dict:
+        return {
+            "event": event,
+            "name": name,
+            "run_id": str(uuid.uuid4()),
+            "parent_ids": [],
+            "tags": ["answer_cache"],
+            "metadata": {},
+            "data": data,
+        }
+
+
+def create_chain(
+    llm: BaseLanguageModel,
+    retriever: BaseRetriever,
+    database_dir: Optional[Path] = None,
+) -> Runnable:
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", SYSTEM_PROMPT),
@@ -59,25 +152,65 @@ def create_chain(llm: BaseLanguageModel, retriever: VectorStoreRetriever) -> Run
         | llm
     )
  
-    return RunnableWithMessageHistory(
+    chain = RunnableWithMessageHistory(
         chain,
         get_session_history,
         input_messages_key="question",
         history_messages_key="chat_history",
     ).with_config({"run_name": "chain_answer"})
 
+    if Config.Cache.ANSWERS:
+        database_dir = database_dir or Config.Path.DATABASE_DIR
+        manifest_path = database_dir / Config.Database.MANIFEST_FILE
+        chain = AnswerCachingChain(
+            chain,
+            AnswerCache(
+                create_embeddings(),
+                version_fn=lambda: collection_version(manifest_path),
+                threshold=Config.Cache.ANSWER_SIMILARITY,
+                ttl_seconds=Config.Cache.ANSWER_TTL_SECONDS,
+                max_entries=Config.Cache.ANSWER_MAX_ENTRIES,
+            ),
+        )
+    return chain
+
+
+def build_chain(documents_dir: Optional[Path] = None) -> Runnable:
+    """Chain over the default collection, ingesting ``documents_dir`` first if given.
+
+    Used by the headless entry points (server and batch CLI).
+    """
+    llm = create_llm()
+    vector_store = None
+    if documents_dir is not None:
+        from .ingestor import Ingestor
+
+        vector_store = Ingestor().ingest(sorted(documents_dir.glob("*.pdf")))
+    return create_chain(llm, create_retriever(llm, vector_store=vector_store))
+
 async def ask_question(chain: Runnable, question: str, session_id: str):
-    async for event in chain.astream_events(
-        {"question": question},
-        config={
-            "callbacks": [ConsoleCallbackHandler()] if Config.DEBUG else [],
-            "configurable": {"session_id": session_id},
-        },
-        version="v2",
-        include_names=["context_retriever", "chain_answer"],
-    ):
-        event_type = event["event"]
-        if event_type == "on_retriever_end":
-            yield event["data"]["output"]
-        if event_type == "on_chain_stream":
-            yield event["data"]["chunk"].content
\ No newline at end of file
+    """Yields the retrieved documents, the answer chunks and finally the timings."""
+    timer = RequestTimer()
+    profiler = get_profiler()
+    profile = profiler.start() if profiler else None
+    try:
+        async for event in chain.astream_events(
+            {"question": question},
+            config={
+                "callbacks": [ConsoleCallbackHandler()] if Config.DEBUG else [],
+                "configurable": {"session_id": session_id},
+            },
+            version="v2",
+        ):
+            timer.observe(event)
+            event_type, name = event["event"], event["name"]
+            if event_type == "on_retriever_end" and name == "context_retriever":
+                yield event["data"]["output"]
+            if event_type == "on_chain_stream" and name == "chain_answer":
+                yield event["data"]["chunk"].content
+    finally:
+        timings = timer.finish()
+        if profiler:
+            profiler.stop(profile, timings["total_seconds"])
+    get_metrics().observe(timings)
+    yield timings
\ No newline at end of file
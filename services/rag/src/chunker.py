@@ -0,0 +1,147 @@
+import copy
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import BaseDocumentTransformer, Document
+from langchain_core.embeddings import Embeddings
+
+BREAKPOINT_DEFAULTS: Dict[str, float] = {
+    "percentile": 95,
+    "standard_deviation": 3,
+    "interquartile": 1.5,
+    "gradient": 95,
+}
+
+
+class FastSemanticChunker(BaseDocumentTransformer):
+    """Drop-in replacement for langchain_experimental's ``SemanticChunker``.
+
+    Breakpoints follow the same rules, but the sentence windows of all texts are
+    embedded together in large batches and the distances and thresholds are
+    computed as array operations. Windows longer than ``max_window_chars`` are
+    truncated before embedding; the embedding model truncates its input anyway,
+    so only text it would never see is dropped.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        buffer_size: int = 1,
+        add_start_index: bool = False,
+        breakpoint_threshold_type: str = "percentile",
+        breakpoint_threshold_amount: Optional[float] = None,
+        sentence_split_regex: str = r"(?<=[.?!])\s+",
+        batch_size: int = 512,
+        max_window_chars: Optional[int] = None,
+    ) -> None:
+        if breakpoint_threshold_type not in BREAKPOINT_DEFAULTS:
+            raise ValueError(
+                f"Got unexpected `breakpoint_threshold_type`: {breakpoint_threshold_type}"
+            )
+        self.embeddings = embeddings
+        self.buffer_size = buffer_size
+        self.add_start_index = add_start_index
+        self.breakpoint_threshold_type = breakpoint_threshold_type
+        self.breakpoint_threshold_amount = (
+            BREAKPOINT_DEFAULTS[breakpoint_threshold_type]
+            if breakpoint_threshold_amount is None
+            else breakpoint_threshold_amount
+        )
+        self.sentence_split_regex = sentence_split_regex
+        self.batch_size = batch_size
+        self.max_window_chars = max_window_chars
+
+    def _windows(self, sentences: List[str]) -> List[str]:
+        windows = []
+        for i in range(len(sentences)):
+            window = " ".join(
+                sentences[max(0, i - self.buffer_size) : i + 1 + self.buffer_size]
+            )
+            windows.append(window[: self.max_window_chars])
+        return windows
+
+    def _embed(self, windows: List[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(windows), self.batch_size):
+            vectors.extend(
+                self.embeddings.embed_documents(
+                    windows[start : start + self.batch_size]
+                )
+            )
+        return np.asarray(vectors, dtype=np.float64)
+
+    def _breakpoints(self, distances: np.ndarray) -> np.ndarray:
+        amount = self.breakpoint_threshold_amount
+        values = distances
+        if self.breakpoint_threshold_type == "percentile":
+            threshold = np.percentile(distances, amount)
+        elif self.breakpoint_threshold_type == "standard_deviation":
+            threshold = np.mean(distances) + amount * np.std(distances)
+        elif self.breakpoint_threshold_type == "interquartile":
+            q1, q3 = np.percentile(distances, [25, 75])
+            threshold = np.mean(distances) + amount * (q3 - q1)
+        else:
+            values = np.gradient(distances, np.arange(len(distances)))
+            threshold = np.percentile(values, amount)
+        return np.flatnonzero(values > threshold)
+
+    def split_texts(self, texts: List[str]) -> List[List[str]]:
+        sentence_lists = [re.split(self.sentence_split_regex, text) for text in texts]
+        # Texts that SemanticChunker would return unsplit are never embedded.
+        min_sentences = 3 if self.breakpoint_threshold_type == "gradient" else 2
+        to_embed = [
+            i
+            for i, sentences in enumerate(sentence_lists)
+            if len(sentences) >= min_sentences
+        ]
+        results = [list(sentences) for sentences in sentence_lists]
+        if not to_embed:
+            return results
+        windows = [self._windows(sentence_lists[i]) for i in to_embed]
+        vectors = self._embed([window for group in windows for window in group])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        offset = 0
+        for i, group in zip(to_embed, windows):
+            group_vectors = vectors[offset : offset + len(group)]
+            offset += len(group)
+            distances = 1 - np.einsum("ij,ij->i", group_vectors[:-1], group_vectors[1:])
+            sentences = sentence_lists[i]
+            bounds = [0, *(self._breakpoints(distances) + 1).tolist()]
+            if bounds[-1] < len(sentences):
+                bounds.append(len(sentences))
+            results[i] = [
+                " ".join(sentences[start:end]) for start, end in zip(bounds, bounds[1:])
+            ]
+        return results
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_texts([text])[0]
+
+    def create_documents(
+        self, texts: List[str], metadatas: Optional[List[dict]] = None
+    ) -> List[Document]:
+        _metadatas = metadatas or [{}] * len(texts)
+        documents = []
+        for metadata, chunks in zip(_metadatas, self.split_texts(texts)):
+            start_index = 0
+            for chunk in chunks:
+                chunk_metadata = copy.deepcopy(metadata)
+                if self.add_start_index:
+                    chunk_metadata["start_index"] = start_index
+                documents.append(Document(page_content=chunk, metadata=chunk_metadata))
+                start_index += len(chunk)
+        return documents
+
+    def split_documents(self, documents: Sequence[Document]) -> List[Document]:
+        return self.create_documents(
+            [document.page_content for document in documents],
+            metadatas=[document.metadata for document in documents],
+        )
+
+    def transform_documents(
+        self, documents: Sequence[Document], **kwargs: Any
+    ) -> Sequence[Document]:
+        return self.split_documents(list(documents))
@@ -5,11 +5,28 @@ class Config:
     class Path:
         APP_HOME = Path(os.getenv("APP_HOME", Path(__file__).parent.parent))
         DATABASE_DIR = APP_HOME / "docs-db"
+        COLLECTIONS_DIR = DATABASE_DIR / "collections"
         DOCUMENTS_DIR = APP_HOME / "tmp"
+        CACHE_DIR = APP_HOME / "cache"
         IMAGES_DIR = APP_HOME / "images"
+        SESSIONS_FILE = APP_HOME / "sessions.sqlite"
+        METRICS_FILE = APP_HOME / "metrics" / "rag.prom"  # or a .json name for JSON
+        PROFILES_DIR = APP_HOME / "metrics" / "profiles"
  
     class Database:
         DOCUMENTS_COLLECTION = "documents"
+        MANIFEST_FILE = "manifest.json"
+        BM25_FILE = "bm25.sqlite"
+        CATALOG_FILE = "catalog.json"
+        MAX_DISK_BYTES = 5 * 1024**3  # for all uploaded collections and files together
+        UPLOAD_GRACE_SECONDS = 3600  # unreferenced uploads are kept this long
+        BACKEND = "qdrant"  # or "flat" / "ivf" for the memory-mapped local index
+        LOCAL_INDEX_DIR = "local-index"
+        QUANTIZATION = "int8"  # or "float16"
+        RESCORE_FACTOR = 4
+        IVF_LISTS = 256
+        IVF_PROBES = 16
+        IVF_MIN_TRAIN = 10_000
  
     class Model:
         EMBEDDINGS = "BAAI/bge-base-en-v1.5"
@@ -19,10 +36,70 @@ class Config:
         TEMPERATURE = 0.0
         MAX_TOKENS = 8000
         USE_LOCAL = False
+        USE_FAKE = False  # canned answers, for running offline
+        FAKE_ANSWER = "Ini adalah jawaban uji dari model palsu."
+        WARM_UP = True
+ 
+    class Ingestor:
+        WORKERS = 1
+        BATCH_SIZE = 256
+        QUEUE_SIZE = 4
+        CHUNKER = "fast"  # or "semantic" for langchain_experimental's SemanticChunker
+        EMBEDDING_BATCH_SIZE = 512
+        MAX_WINDOW_CHARS = 2048
+        MANIFEST_SAVE_SECONDS = 5.0  # while a file is ingested; always saved at its end
+ 
+    class Cache:
+        EMBEDDINGS_MAX_ITEMS = 100_000
+        ANSWERS = True
+        ANSWER_SIMILARITY = 0.95
+        ANSWER_TTL_SECONDS = 3600
+        ANSWER_MAX_ENTRIES = 1000
+        LLM_RESPONSES = True  # only while Model.TEMPERATURE is 0
+        LLM_RESPONSES_MAX_BYTES = 256 * 1024**2
+ 
+    class Context:
+        TOKEN_BUDGET = 3000  # estimated at four characters per token
+        DUPLICATE_SIMILARITY = 0.9  # share of a chunk's words already in the context
+ 
+    class Session:
+        MAX_SESSIONS = 1000
+        TTL_SECONDS = 24 * 3600
+        MAX_MESSAGES = 100
+        HISTORY_TOKEN_LIMIT = 2000  # of past messages sent with each question
+        PERSIST = False  # keep histories in Path.SESSIONS_FILE across restarts
+ 
+    class Batching:
+        ENABLED = True
+        MAX_BATCH_SIZE = 32
+        MAX_WAIT_MS = 3.0
+        POOL_SIZE = 32  # threads per retrieval pool, instead of Retriever.*_CONCURRENCY
  
     class Retriever:
         USE_RERANKER = True
         USE_CHAIN_FILTER = False
+        FILTER_MODE = "batch"  # or "parallel" for one concurrent LLM call per document
+        FILTER_MAX_CONCURRENCY = 4
+        FILTER_KEEP_SCORE = 0.9  # reranker scores that skip the LLM filter
+        FILTER_DROP_SCORE = 0.05
+        MODE = "dense"  # or "hybrid" to fuse BM25 and dense results
+        K = 5
+        HYBRID_FETCH_K = 20
+        RRF_K = 60
+        SEARCH_CONCURRENCY = 8
+        RERANK_CONCURRENCY = 2
+ 
+    class Server:
+        HOST = "127.0.0.1"
+        PORT = 8000
+        MAX_CONCURRENCY = 16  # questions answered at once
+        MAX_QUEUE = 64  # questions waiting for a slot before 503
+ 
+    class Metrics:
+        WRITE_FILE = True
+        PROFILE = False
+        PROFILER = "cprofile"  # or "pyinstrument" if it is installed
+        SLOW_REQUEST_SECONDS = 5.0
  
     DEBUG = False
     CONVERSATION_MESSAGES_LIMIT = 6
\ No newline at end of file
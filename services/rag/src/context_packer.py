@@ -0,0 +1,106 @@
+import re
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+SEPARATOR = "\n---\n"
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four characters per token for English BPE."""
+    return (len(text) + 3) // 4
+
+
+class PackStats(NamedTuple):
+    documents_in: int
+    documents_out: int
+    tokens_in: int
+    tokens_out: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+class _Span:
+    def __init__(self, document: Document) -> None:
+        self.key = (document.metadata.get("source"), document.metadata.get("section"))
+        self.start: Optional[int] = document.metadata.get("start_index")
+        self.text = document.page_content
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+    def merge(self, other: "_Span") -> bool:
+        """Absorbs ``other`` if both cut the same text and overlap or touch."""
+        if self.key != other.key or self.start is None or other.start is None:
+            return False
+        first, second = (self, other) if self.start <= other.start else (other, self)
+        if second.start > first.end:
+            return False
+        overlap = first.end - second.start
+        if first.text[second.start - first.start :] != second.text[:overlap]:
+            return False
+        text = first.text + second.text[overlap:]
+        self.start, self.text = first.start, text
+        return True
+
+
+def _words(text: str) -> Set[str]:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _containment(words: Set[str], seen: Set[str]) -> float:
+    return len(words & seen) / len(words) if words else 1.0
+
+
+def pack_documents(
+    documents: List[Document], token_budget: int, duplicate_similarity: float
+) -> Tuple[List[str], PackStats]:
+    """Turns retrieved chunks, best first, into as few context blocks as possible.
+
+    Overlapping or adjacent chunks of the same section are stitched back
+    together using ``start_index``, chunks whose words are nearly all in an
+    earlier block are dropped, and blocks are taken in relevance order until
+    ``token_budget`` is reached. Only the first block is ever truncated.
+    """
+    spans: List[_Span] = []
+    for document in documents:
+        span = _Span(document)
+        target = next((s for s in spans if s.merge(span)), None)
+        if target is None:
+            spans.append(span)
+            continue
+        # The grown span may now bridge the gap to another one.
+        while True:
+            other = next(
+                (s for s in spans if s is not target and target.merge(s)), None
+            )
+            if other is None:
+                break
+            spans.remove(other)
+
+    blocks: List[str] = []
+    word_sets: List[Set[str]] = []
+    used = 0
+    for span in spans:
+        words = _words(span.text)
+        if any(_containment(words, seen) >= duplicate_similarity for seen in word_sets):
+            continue
+        cost = estimate_tokens(span.text) + estimate_tokens(SEPARATOR)
+        if used + cost > token_budget:
+            if blocks:
+                continue
+            span.text = span.text[: max(0, token_budget * 4)]
+            cost = estimate_tokens(span.text)
+        blocks.append(span.text)
+        word_sets.append(words)
+        used += cost
+
+    tokens_in = sum(
+        estimate_tokens(document.page_content) + estimate_tokens(SEPARATOR)
+        for document in documents
+    )
+    return blocks, PackStats(len(documents), len(blocks), tokens_in, used)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .metrics import timed_stage
+
+
+class VectorCache:
+    """Fixed-capacity vector store on disk with LRU eviction.
+
+    Vectors live in a memory-mapped float32 file of ``max_items`` rows. The key
+    index is two small arrays: 16-byte key digests and last-use ticks (0 marks
+    a free slot). It is kept in memory and persisted row by row in SQLite, so a
+    put only writes the slots it changed. Ticks set by ``get`` are written with
+    the next put.
+    """
+
+    _instances: Dict[Path, "VectorCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self, directory: Path, max_items: int, read_only: bool = False
+    ) -> None:
+        self.directory = directory
+        self.max_items = max_items
+        self.read_only = read_only
+        self.dim: Optional[int] = None
+        self.keys = np.zeros((max_items, 16), dtype=np.uint8)
+        self.ticks = np.zeros(max_items, dtype=np.int64)
+        self.slots: Dict[bytes, int] = {}
+        self.vectors: Optional[np.memmap] = None
+        self.touched: Set[int] = set()
+        self.connection: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def open(
+        cls, directory: Path, max_items: int, read_only: bool = False
+    ) -> "VectorCache":
+        with cls._instances_lock:
+            cache = cls._instances.get(directory)
+            if cache is None or cache.max_items != max_items:
+                cache = cls(directory, max_items, read_only=read_only)
+                if not read_only:
+                    cls._instances[directory] = cache
+            return cache
+
+    def _load(self) -> None:
+        meta_path = self.directory / "meta.json"
+        if not meta_path.exists():
+            return
+        if not self.read_only:
+            # Left behind by the index format before index.sqlite.
+            (self.directory / "index.npz").unlink(missing_ok=True)
+        meta = json.loads(meta_path.read_text())
+        if meta["max_items"] != self.max_items:
+            return
+        connection = self._connect()
+        for slot, key, tick in connection.execute("SELECT slot, key, tick FROM slots"):
+            self.keys[slot] = np.frombuffer(key, dtype=np.uint8)
+            self.ticks[slot] = tick
+            self.slots[key] = slot
+        if self.read_only:
+            connection.close()
+        else:
+            self.connection = connection
+        self._open_vectors(meta["dim"], "r" if self.read_only else "r+")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.directory / "index.sqlite", check_same_thread=False
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS slots "
+            "(slot INTEGER PRIMARY KEY, key BLOB, tick INTEGER)"
+        )
+        return connection
+
+    def _open_vectors(self, dim: int, mode: str) -> None:
+        self.dim = dim
+        self.vectors = np.memmap(
+            self.directory / "vectors.f32",
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.max_items, dim),
+        )
+
+    def get(self, keys: List[bytes]) -> List[Optional[List[float]]]:
+        with self.lock:
+            tick = int(self.ticks.max()) + 1
+            results = []
+            for key in keys:
+                slot = self.slots.get(key)
+                if slot is None:
+                    results.append(None)
+                    continue
+                self.ticks[slot] = tick
+                self.touched.add(slot)
+                results.append(self.vectors[slot].tolist())
+            return results
+
+    def put(self, keys: List[bytes], vectors: List[List[float]]) -> None:
+        if self.read_only or not keys:
+            return
+        with self.lock:
+            if self.vectors is None or self.dim != len(vectors[0]):
+                # All models share the file, whose width is fixed; a model
+                # with another dimension starts the cache over.
+                self._create(len(vectors[0]))
+            tick = int(self.ticks.max()) + 1
+            new_keys = [key for key in dict.fromkeys(keys) if key not in self.slots]
+            slots = self._free_slots(len(new_keys))
+            # Evicted keys go first, so a crash while their slots are being
+            # overwritten cannot map them to someone else's vector.
+            with self.connection:
+                self.connection.executemany(
+                    "DELETE FROM slots WHERE slot = ?",
+                    [(int(slot),) for slot in slots if self.ticks[slot]],
+                )
+            for key, slot in zip(new_keys, slots):
+                old_key = self.keys[slot].tobytes()
+                if self.ticks[slot] and self.slots.get(old_key) == slot:
+                    del self.slots[old_key]
+                self.keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self.ticks[slot] = tick
+                self.slots[key] = int(slot)
+            by_key = dict(zip(keys, vectors))
+            for key, slot in zip(new_keys, slots):
+                self.vectors[slot] = by_key[key]
+            self.vectors.flush()
+            self.touched.difference_update(int(slot) for slot in slots)
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO slots VALUES (?, ?, ?)",
+                    [(int(slot), key, tick) for key, slot in zip(new_keys, slots)],
+                )
+                self.connection.executemany(
+                    "UPDATE slots SET tick = ? WHERE slot = ?",
+                    [(int(self.ticks[slot]), slot) for slot in self.touched],
+                )
+            self.touched.clear()
+
+    def _create(self, dim: int) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.keys[:] = 0
+        self.ticks[:] = 0
+        self.slots = {}
+        self.touched.clear()
+        self._open_vectors(dim, "w+")
+        if self.connection is None:
+            self.connection = self._connect()
+        with self.connection:
+            self.connection.execute("DELETE FROM slots")
+        (self.directory / "meta.json").write_text(
+            json.dumps({"dim": dim, "max_items": self.max_items})
+        )
+
+    def _free_slots(self, count: int) -> np.ndarray:
+        count = min(count, self.max_items)
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.argpartition(self.ticks, count - 1)[:count]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that looks up every text in a ``VectorCache`` first."""
+
+    def __init__(
+        self, embeddings: Embeddings, model_name: str, cache: VectorCache
+    ) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+
+    def _key(self, kind: str, text: str) -> bytes:
+        return hashlib.blake2b(
+            f"{self.model_name}\0{kind}\0{text}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("document", text) for text in texts]
+        vectors = self.cache.get(keys)
+        missing = {
+            key: text
+            for key, text, vector in zip(keys, texts, vectors)
+            if vector is None
+        }
+        if missing:
+            computed = dict(
+                zip(missing, self.embeddings.embed_documents(list(missing.values())))
+            )
+            self.cache.put(list(computed), list(computed.values()))
+            vectors = [
+                computed[key] if vector is None else vector
+                for key, vector in zip(keys, vectors)
+            ]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        vector = self.cache.get([key])[0]
+        if vector is None:
+            with timed_stage("embed"):
+                vector = self.embeddings.embed_query(text)
+            self.cache.put([key], [vector])
+        return vector
@@ -1,41 +1,335 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
- 
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
 from langchain_community.document_loaders import PyPDFium2Loader
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_qdrant import Qdrant
 from langchain_text_splitters import RecursiveCharacterTextSplitter
- 
+
+from .chunker import FastSemanticChunker
+from .bm25 import BM25Index
 from .config import Config
- 
- 
-class Ingestor:
+from .manifest import Manifest, chunk_id, file_hash, text_hash
+from .model import create_embeddings
+from .vector_store import create_vector_store, open_vector_store
+
+
+class IngestProgress(NamedTuple):
+    files_done: int
+    files_total: int
+    chunks_done: int
+
+
+class IngestStats:
+    """Item counts and seconds spent per ingest stage (parse, split, embed, upsert)."""
+
     def __init__(self) -> None:
-        self.embeddings = FastEmbedEmbeddings(model_name=Config.Model.EMBEDDINGS)
-        self.semantic_splitter = SemanticChunker(
-            self.embeddings, breakpoint_threshold_type="interquartile"
+        self.stages: Dict[str, list] = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"stages": self.stages}
+
+    def __setstate__(self, state: dict) -> None:
+        self.stages = state["stages"]
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, count: int, seconds: float) -> None:
+        with self.lock:
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += count
+            totals[1] += seconds
+
+    def seconds(self, stage: str) -> float:
+        return self.stages.get(stage, [0, 0.0])[1]
+
+    def merge(self, other: "IngestStats") -> None:
+        for stage, (count, seconds) in list(other.stages.items()):
+            self.record(stage, count, seconds)
+
+    def as_dict(self) -> Dict[str, dict]:
+        return {
+            stage: {
+                "count": count,
+                "seconds": round(seconds, 4),
+                "per_second": round(count / seconds, 2) if seconds else None,
+            }
+            for stage, (count, seconds) in list(self.stages.items())
+        }
+
+
+class _TimedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, stats: IngestStats) -> None:
+        self.embeddings = embeddings
+        self.stats = stats
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        self.stats.record("embed", len(texts), time.perf_counter() - start)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class Ingestor:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        worker: bool = False,
+        embeddings: Optional[Embeddings] = None,
+    ) -> None:
+        self.workers = workers or Config.Ingestor.WORKERS
+        self.embeddings = embeddings or create_embeddings(
+            read_only_cache=worker, threads=1 if worker else None
         )
+        self.stats = IngestStats()
+        self.database_dir = Config.Path.DATABASE_DIR
+        self.store_embeddings = _TimedEmbeddings(self.embeddings, self.stats)
+        if Config.Ingestor.CHUNKER == "fast":
+            self.semantic_splitter = FastSemanticChunker(
+                self.embeddings,
+                breakpoint_threshold_type="interquartile",
+                batch_size=Config.Ingestor.EMBEDDING_BATCH_SIZE,
+                max_window_chars=Config.Ingestor.MAX_WINDOW_CHARS,
+            )
+        else:
+            from langchain_experimental.text_splitter import SemanticChunker
+
+            self.semantic_splitter = SemanticChunker(
+                self.embeddings, breakpoint_threshold_type="interquartile"
+            )
         self.recursive_splitter = RecursiveCharacterTextSplitter(
             chunk_size=2048,
             chunk_overlap=128,
             add_start_index=True,
         )
- 
-    def ingest(self, doc_paths: List[Path]) -> VectorStore:
-        documents = []
-        for doc_path in doc_paths:
-            loaded_documents = PyPDFium2Loader(doc_path).load()
-            document_text = "\n".join([doc.page_content for doc in loaded_documents])
-            documents.extend(
-                self.recursive_splitter.split_documents(
-                    self.semantic_splitter.create_documents([document_text])
-                )
+
+    def ingest(
+        self,
+        doc_paths: List[Path],
+        on_progress: Optional[Callable[[IngestProgress], None]] = None,
+        database_dir: Optional[Path] = None,
+        digests: Optional[Dict[str, str]] = None,
+    ) -> VectorStore:
+        """Brings the collection in ``database_dir`` in line with ``doc_paths``.
+
+        ``digests`` maps file names to content hashes already computed by the
+        caller; missing ones are hashed here.
+        """
+        self.database_dir = database_dir or Config.Path.DATABASE_DIR
+        manifest = Manifest.load(self.database_dir / Config.Database.MANIFEST_FILE)
+        vector_store = self._open_vector_store() if manifest.files else None
+        index = BM25Index(self.database_dir / Config.Database.BM25_FILE)
+        if not manifest.files:
+            index.clear()
+        digests = {
+            doc_path.name: (digests or {}).get(doc_path.name) or file_hash(doc_path)
+            for doc_path in doc_paths
+        }
+
+        stale_ids = []
+        for file_name in manifest.files.keys() - digests.keys():
+            stale_ids.extend(manifest.remove(file_name))
+        if stale_ids:
+            vector_store.delete(stale_ids)
+            index.remove(stale_ids)
+            manifest.save()
+
+        pending_paths = [
+            doc_path
+            for doc_path in doc_paths
+            if not manifest.is_current(doc_path.name, digests[doc_path.name])
+        ]
+        previous = {
+            doc_path.name: set(manifest.chunk_hashes(doc_path.name))
+            for doc_path in pending_paths
+        }
+        batches = queue.Queue(maxsize=Config.Ingestor.QUEUE_SIZE)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(pending_paths, previous, batches, stop),
+            daemon=True,
+        )
+        producer.start()
+
+        started = set()
+        saved = time.monotonic()
+        progress = IngestProgress(0, len(pending_paths), 0)
+        if on_progress:
+            on_progress(progress)
+        try:
+            while (item := batches.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                kind, file_name, chunks = item
+                if file_name not in started:
+                    manifest.start(file_name, digests[file_name])
+                    started.add(file_name)
+                if kind == "batch":
+                    documents = [document for _, document in chunks]
+                    ids = [chunk_id(file_name, chunk_hash) for chunk_hash, _ in chunks]
+                    vector_store = self._upsert(vector_store, documents, ids)
+                    index.add(ids, documents)
+                    manifest.commit(file_name, [chunk_hash for chunk_hash, _ in chunks])
+                    progress = progress._replace(
+                        chunks_done=progress.chunks_done + len(chunks)
+                    )
+                else:
+                    stale_hashes = set(manifest.chunk_hashes(file_name)) - set(chunks)
+                    if stale_hashes:
+                        stale_ids = [chunk_id(file_name, h) for h in stale_hashes]
+                        vector_store.delete(stale_ids)
+                        index.remove(stale_ids)
+                    manifest.finish(file_name, chunks)
+                    progress = progress._replace(files_done=progress.files_done + 1)
+                # The whole manifest is rewritten on every save, so batches of
+                # a large file are saved at most every MANIFEST_SAVE_SECONDS.
+                if (
+                    kind == "end"
+                    or time.monotonic() - saved >= Config.Ingestor.MANIFEST_SAVE_SECONDS
+                ):
+                    manifest.save()
+                    saved = time.monotonic()
+                if on_progress:
+                    on_progress(progress)
+        finally:
+            stop.set()
+            manifest.save()
+        producer.join()
+
+        if vector_store is None:
+            raise ValueError("No documents to ingest")
+        return vector_store
+
+    def _produce(
+        self,
+        doc_paths: List[Path],
+        previous: Dict[str, Set[str]],
+        batches: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        def put(item) -> None:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        try:
+            for doc_path, documents in self._split_all(doc_paths):
+                file_name = doc_path.name
+                seen, batch = {}, []
+                for document in documents:
+                    chunk_hash = text_hash(document.page_content)
+                    if chunk_hash in seen:
+                        continue
+                    seen[chunk_hash] = None
+                    if chunk_hash in previous[file_name]:
+                        continue
+                    batch.append((chunk_hash, document))
+                    if len(batch) == Config.Ingestor.BATCH_SIZE:
+                        put(("batch", file_name, batch))
+                        batch = []
+                if batch:
+                    put(("batch", file_name, batch))
+                put(("end", file_name, list(seen)))
+                if stop.is_set():
+                    return
+            put(None)
+        except Exception as e:
+            put(e)
+
+    def _split_all(
+        self, doc_paths: List[Path]
+    ) -> Iterator[Tuple[Path, Iterable[Document]]]:
+        workers = min(self.workers, len(doc_paths))
+        if workers <= 1:
+            for doc_path in doc_paths:
+                yield doc_path, self._split(doc_path, self.stats)
+            return
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as executor:
+            futures = [executor.submit(_split_in_worker, path) for path in doc_paths]
+            for future in as_completed(futures):
+                doc_path, documents, stats = future.result()
+                self.stats.merge(stats)
+                yield doc_path, documents
+
+    def _split(self, doc_path: Path, stats: IngestStats) -> Iterator[Document]:
+        start = time.perf_counter()
+        pages = [page.page_content for page in PyPDFium2Loader(doc_path).lazy_load()]
+        document_text = "\n".join(pages)
+        stats.record("parse", len(pages), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        sections = self.semantic_splitter.create_documents(
+            [document_text], metadatas=[{"source": doc_path.name}]
+        )
+        stats.record("split", 0, time.perf_counter() - start)
+        for section_index, section in enumerate(sections):
+            section.metadata["section"] = section_index
+            start = time.perf_counter()
+            documents = self.recursive_splitter.split_documents([section])
+            stats.record("split", len(documents), time.perf_counter() - start)
+            yield from documents
+
+    def _upsert(
+        self,
+        vector_store: Optional[VectorStore],
+        documents: List[Document],
+        ids: List[str],
+    ) -> Optional[VectorStore]:
+        if not documents:
+            return vector_store
+        start = time.perf_counter()
+        embed_seconds = self.stats.seconds("embed")
+        if vector_store is None:
+            vector_store = create_vector_store(
+                documents, ids, self.store_embeddings, self.database_dir
             )
-        return Qdrant.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            path=Config.Path.DATABASE_DIR,
-            collection_name=Config.Database.DOCUMENTS_COLLECTION,
-        )
\ No newline at end of file
+        else:
+            vector_store.add_documents(documents, ids=ids)
+        embed_seconds = self.stats.seconds("embed") - embed_seconds
+        self.stats.record(
+            "upsert", len(documents), time.perf_counter() - start - embed_seconds
+        )
+        return vector_store
+
+    def _open_vector_store(self) -> VectorStore:
+        return open_vector_store(self.store_embeddings, self.database_dir)
+
+
+_worker_ingestor: Optional[Ingestor] = None
+
+
+def _init_worker() -> None:
+    global _worker_ingestor
+    _worker_ingestor = Ingestor(worker=True)
+
+
+def _split_in_worker(doc_path: Path) -> Tuple[Path, List[Document], IngestStats]:
+    stats = IngestStats()
+    return doc_path, list(_worker_ingestor._split(doc_path, stats)), stats
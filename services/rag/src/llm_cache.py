@@ -0,0 +1,265 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig
+from pydantic import ConfigDict
+
+_caches: Dict[str, "ResponseCache"] = {}
+
+# The wrapper reports the run itself; without this the wrapped model would
+# inherit the callbacks from the context and every token would be seen twice.
+_UNTRACED: RunnableConfig = {"callbacks": []}
+
+
+class ResponseCache:
+    """LLM responses in SQLite, keyed by a digest of everything sent to the model.
+
+    Each response is stored as the list of chunks it was streamed in, so it can
+    be replayed the same way. Once the stored responses take more than
+    ``max_bytes``, the least recently used ones are deleted.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER,
+                last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+            """)
+        (self.size,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        _caches[path.stem] = self
+
+    def get(self, key: str) -> Optional[dict]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            return json.loads(row[0])
+
+    def put(self, key: str, model: str, response: dict) -> None:
+        value = json.dumps(response)
+        with self.lock, self.connection:
+            old = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, len(value), time.time()),
+            )
+            self.size += len(value) - (old[0] if old else 0)
+            while self.size > self.max_bytes:
+                rows = self.connection.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used LIMIT 64"
+                ).fetchall()
+                if not rows:
+                    break
+                self.connection.executemany(
+                    "DELETE FROM responses WHERE key = ?", [(k,) for k, _ in rows]
+                )
+                self.size -= sum(size for _, size in rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            (entries,) = self.connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": entries,
+                "size_mb": round(self.size / 2**20, 2),
+            }
+
+
+def response_cache_metrics() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def response_key(model: str, messages: List[BaseMessage], params: dict) -> str:
+    # Only the role and content of each message count: ids and run metadata
+    # differ between runs even when the prompt is identical.
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": [(message.type, message.content) for message in messages],
+            "params": params,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedChatModel(BaseChatModel):
+    """Chat model wrapper answering repeated prompts from a ``ResponseCache``.
+
+    The key covers the wrapped model's type and parameters (model name,
+    temperature, token limit), the messages and any call arguments. Cached
+    answers are streamed back chunk by chunk. A response is only stored once
+    the wrapped model finished it.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: BaseChatModel
+    response_cache: ResponseCache
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # Some integrations (ChatGroq) report no identifying params at all, so
+        # the LangSmith params and the request defaults are merged in: without
+        # them, two models of one provider would share cache keys.
+        return {
+            **self.llm._get_ls_params(),
+            **self.llm._identifying_params,
+            **getattr(self.llm, "_default_params", {}),
+        }
+
+    def _model(self) -> str:
+        params = json.dumps(self._identifying_params, sort_keys=True, default=str)
+        return f"{self.llm._llm_type}:{params}"
+
+    def _key(
+        self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any
+    ) -> str:
+        return response_key(self._model(), messages, {"stop": stop, **kwargs})
+
+    def _replay(self, cached: dict) -> Iterator[ChatGenerationChunk]:
+        chunks = cached["chunks"] or [""]
+        for i, text in enumerate(chunks):
+            last = i == len(chunks) - 1
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=text, usage_metadata=cached["usage"] if last else None
+                )
+            )
+
+    @staticmethod
+    def _response(chunks: List[str], usage: Optional[dict]) -> dict:
+        return {"chunks": chunks, "usage": usage}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, **kwargs)
+        cached = self.response_cache.get(key)
+        if cached is None:
+            message = self.llm.invoke(messages, config=_UNTRACED, stop=stop, **kwargs)
+            cached = self._response([message.content], message.usage_metadata)
+            self.response_cache.put(key, self._model(), cached)
+        message = AIMessage(
+            content="".join(cached["chunks"]), usage_metadata=cached["usage"]
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, **kwargs)
+        cached = self.response_cache.get(key)
+        if cached is None:
+            message = await self.llm.ainvoke(
+                messages, config=_UNTRACED, stop=stop, **kwargs
+            )
+            cached = self._response([message.content], message.usage_metadata)
+            self.response_cache.put(key, self._model(), cached)
+        message = AIMessage(
+            content="".join(cached["chunks"]), usage_metadata=cached["usage"]
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, **kwargs)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            for chunk in self._replay(cached):
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        chunks, usage = [], None
+        for message in self.llm.stream(messages, config=_UNTRACED, stop=stop, **kwargs):
+            chunks.append(message.content)
+            usage = message.usage_metadata or usage
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        self.response_cache.put(key, self._model(), self._response(chunks, usage))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, **kwargs)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            for chunk in self._replay(cached):
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        chunks, usage = [], None
+        async for message in self.llm.astream(
+            messages, config=_UNTRACED, stop=stop, **kwargs
+        ):
+            chunks.append(message.content)
+            usage = message.usage_metadata or usage
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        self.response_cache.put(key, self._model(), self._response(chunks, usage))
@@ -0,0 +1,438 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+SEARCH_BLOCK_ROWS = 65_536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalVectorIndex(VectorStore):
+    """Memory-mapped flat (or IVF) cosine index with quantized scoring.
+
+    Vectors are stored twice on disk: quantized codes (int8 with a per-vector
+    scale, or float16) that are scanned for every query, and the exact float32
+    vectors that are only read to rescore the best ``k * rescore_factor``
+    candidates. Both files are memory-mapped, so the vectors are not held in
+    RAM; what does grow with the collection is a liveness flag per row and, in
+    IVF mode, the row ids of the inverted lists. In IVF mode a spherical
+    k-means coarse quantizer is trained once ``ivf_min_train`` vectors exist
+    and a query only scans the ``ivf_probes`` closest lists.
+
+    Payloads live in SQLite. Deleted or replaced points are tombstoned.
+    ``meta.json`` holds the committed row count: rows past it, left behind by
+    a crash in the middle of ``add_texts``, are cut off before the next append.
+    It also records the quantization; opening the index with another one
+    re-encodes the codes from the exact vectors.
+    """
+
+    _instances: Dict[Path, "LocalVectorIndex"] = {}
+    _instances_lock = threading.Lock()
+    # Settings that change the files or lists a loaded index works from.
+    _reload_settings = ("quantization", "ivf")
+
+    def __init__(
+        self,
+        directory: Path,
+        embedding: Embeddings,
+        quantization: str = "int8",
+        rescore_factor: int = 4,
+        ivf: bool = False,
+        ivf_lists: int = 256,
+        ivf_probes: int = 16,
+        ivf_min_train: int = 10_000,
+    ) -> None:
+        if quantization not in ("int8", "float16"):
+            raise ValueError(f"Unknown quantization: {quantization}")
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.embedding = embedding
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.ivf = ivf
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.ivf_min_train = ivf_min_train
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(
+            directory / "payload.sqlite", check_same_thread=False
+        )
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS points (
+                row INTEGER PRIMARY KEY, id TEXT, content TEXT, metadata TEXT,
+                list INTEGER, deleted INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS points_id ON points (id);
+            """)
+        self.dim: Optional[int] = None
+        self.count = 0
+        self.vectors = self.codes = self.scales = self.centroids = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.lists: List[List[int]] = []
+        self._load()
+
+    @classmethod
+    def open(
+        cls, directory: Path, embedding: Embeddings, **kwargs: Any
+    ) -> "LocalVectorIndex":
+        with cls._instances_lock:
+            index = cls._instances.get(directory)
+            if index is None or any(
+                getattr(index, name) != kwargs[name]
+                for name in cls._reload_settings
+                if name in kwargs
+            ):
+                index = cls._instances[directory] = cls(directory, embedding, **kwargs)
+            for name, value in kwargs.items():
+                setattr(index, name, value)
+            index.embedding = embedding
+            return index
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    def _load(self) -> None:
+        meta_path = self._path("meta.json")
+        if not meta_path.exists():
+            self._truncate()
+            return
+        meta = json.loads(meta_path.read_text())
+        self.dim, self.count = meta["dim"], meta["count"]
+        if meta["quantization"] != self.quantization:
+            self._requantize()
+        self._truncate()
+        self._map()
+        self.alive = np.zeros(self.count, dtype=bool)
+        rows = self.connection.execute(
+            "SELECT row, list FROM points WHERE deleted = 0"
+        ).fetchall()
+        self.alive[[row for row, _ in rows]] = True
+        if self.ivf and self._path("centroids.npy").exists():
+            self.centroids = np.load(self._path("centroids.npy"))
+            self.lists = [[] for _ in range(len(self.centroids))]
+            # Rows added while IVF was off have no list yet.
+            unassigned = np.asarray(
+                [row for row, list_id in rows if list_id is None], dtype=np.int64
+            )
+            for row, list_id in rows:
+                if list_id is not None:
+                    self.lists[list_id].append(row)
+            if len(unassigned):
+                self._assign_rows(unassigned)
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.quantization == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _requantize(self) -> None:
+        # Codes and scales are rebuilt from the exact vectors under temporary
+        # names; meta.json records the new quantization once both are in place.
+        vectors = np.memmap(
+            self._path("vectors.f32"),
+            dtype=np.float32,
+            mode="r",
+            shape=(self.count, self.dim),
+        )
+        codes_path, scales_path = self._path("codes.tmp"), self._path("scales.tmp")
+        with codes_path.open("wb") as codes_file, scales_path.open("wb") as scales_file:
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                codes, scales = self._encode(
+                    np.asarray(vectors[start : start + SEARCH_BLOCK_ROWS])
+                )
+                codes_file.write(codes.tobytes())
+                if scales is not None:
+                    scales_file.write(scales.tobytes())
+        del vectors
+        os.replace(codes_path, self._path("codes.bin"))
+        if self.quantization == "int8":
+            os.replace(scales_path, self._path("scales.f32"))
+        else:
+            scales_path.unlink()
+            self._path("scales.f32").unlink(missing_ok=True)
+        self._write_meta()
+
+    def _map(self) -> None:
+        shape = (self.count, self.dim)
+        code_dtype = np.int8 if self.quantization == "int8" else np.float16
+        self.vectors = np.memmap(
+            self._path("vectors.f32"), dtype=np.float32, mode="r", shape=shape
+        )
+        self.codes = np.memmap(
+            self._path("codes.bin"), dtype=code_dtype, mode="r", shape=shape
+        )
+        if self.quantization == "int8":
+            self.scales = np.memmap(
+                self._path("scales.f32"), dtype=np.float32, mode="r", shape=shape[:1]
+            )
+
+    def _truncate(self) -> None:
+        # Cuts every file back to the committed count, so a row always sits at
+        # the offset _map computes for it.
+        code_bytes = 1 if self.quantization == "int8" else 2
+        dim = self.dim or 0
+        row_bytes = {"vectors.f32": 4 * dim, "codes.bin": code_bytes * dim}
+        if self.quantization == "int8":
+            row_bytes["scales.f32"] = 4
+        for name, size in row_bytes.items():
+            path = self._path(name)
+            if path.exists() and path.stat().st_size != self.count * size:
+                with path.open("r+b") as f:
+                    f.truncate(self.count * size)
+        with self.connection:
+            self.connection.execute("DELETE FROM points WHERE row >= ?", (self.count,))
+
+    def _write_meta(self) -> None:
+        # Written last and replaced atomically: this is the commit point.
+        temp_path = self._path("meta.json.tmp")
+        temp_path.write_text(
+            json.dumps(
+                {
+                    "dim": self.dim,
+                    "count": self.count,
+                    "quantization": self.quantization,
+                }
+            )
+        )
+        os.replace(temp_path, self._path("meta.json"))
+
+    def clear(self) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM points")
+            for name in ("meta.json", "vectors.f32", "codes.bin", "scales.f32"):
+                self._path(name).unlink(missing_ok=True)
+            self._path("centroids.npy").unlink(missing_ok=True)
+            self.dim = None
+            self.count = 0
+            self.vectors = self.codes = self.scales = self.centroids = None
+            self.alive = np.zeros(0, dtype=bool)
+            self.lists = []
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(
+            np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        )
+        with self.lock:
+            self._delete(ids)
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            self._truncate()
+            with self._path("vectors.f32").open("ab") as f:
+                f.write(vectors.tobytes())
+            codes, scales = self._encode(vectors)
+            with self._path("codes.bin").open("ab") as f:
+                f.write(codes.tobytes())
+            if scales is not None:
+                with self._path("scales.f32").open("ab") as f:
+                    f.write(scales.tobytes())
+
+            rows = list(range(self.count, self.count + len(texts)))
+            list_ids = self._assign(vectors)
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO points (row, id, content, metadata, list) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (row, point_id, text, json.dumps(metadata), list_id)
+                        for row, point_id, text, metadata, list_id in zip(
+                            rows, ids, texts, metadatas, list_ids
+                        )
+                    ],
+                )
+            self.count += len(texts)
+            self.alive = np.concatenate([self.alive, np.ones(len(texts), dtype=bool)])
+            for row, list_id in zip(rows, list_ids):
+                if list_id is not None:
+                    self.lists[list_id].append(row)
+            self._write_meta()
+            self._map()
+            if (
+                self.ivf
+                and self.centroids is None
+                and int(self.alive.sum()) >= self.ivf_min_train
+            ):
+                self._train()
+        return ids
+
+    def _assign(self, vectors: np.ndarray) -> List[Optional[int]]:
+        if self.centroids is None:
+            return [None] * len(vectors)
+        return np.argmax(vectors @ self.centroids.T, axis=1).tolist()
+
+    def _train(self, iterations: int = 10) -> None:
+        rows = np.flatnonzero(self.alive)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(
+            rng.choice(rows, size=min(len(rows), 64 * self.ivf_lists), replace=False)
+        )
+        sample = np.asarray(self.vectors[sample_rows])
+        n_lists = min(self.ivf_lists, len(sample))
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~np.isin(np.arange(n_lists), assignment)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        self.centroids = centroids.astype(np.float32)
+        self.lists = [[] for _ in range(n_lists)]
+        self._assign_rows(rows)
+        # Saved only once every row has its list: an index with centroids on
+        # disk never has rows the lists do not cover.
+        temp_path = self._path("centroids.tmp.npy")
+        np.save(temp_path, self.centroids)
+        os.replace(temp_path, self._path("centroids.npy"))
+
+    def _assign_rows(self, rows: np.ndarray) -> None:
+        updates = []
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block = rows[start : start + SEARCH_BLOCK_ROWS]
+            for row, list_id in zip(block, self._assign(self.vectors[block])):
+                self.lists[list_id].append(int(row))
+                updates.append((list_id, int(row)))
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE points SET list = ? WHERE row = ?", updates
+            )
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        with self.lock:
+            self._delete(ids or [])
+        return True
+
+    def _delete(self, ids: List[str]) -> None:
+        rows = []
+        for point_id in ids:
+            rows.extend(
+                row
+                for (row,) in self.connection.execute(
+                    "SELECT row FROM points WHERE id = ? AND deleted = 0", (point_id,)
+                )
+            )
+        if not rows:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE points SET deleted = 1 WHERE row = ?", [(row,) for row in rows]
+            )
+        self.alive[rows] = False
+
+    def _candidate_rows(self, query: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.arange(self.count)
+        probes = np.argsort(-(self.centroids @ query))[: self.ivf_probes]
+        lists = [np.asarray(self.lists[probe], dtype=np.int64) for probe in probes]
+        return np.sort(np.concatenate(lists)) if lists else np.zeros(0, np.int64)
+
+    def _approximate_scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype=np.float32)
+        contiguous = len(rows) == self.count
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, len(rows))
+            index = slice(start, end) if contiguous else rows[start:end]
+            block = self.codes[index].astype(np.float32) @ query
+            if self.quantization == "int8":
+                block *= self.scales[index]
+            scores[start:end] = block
+        return scores
+
+    def _search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if not self.count:
+            return []
+        rows = self._candidate_rows(query)
+        rows = rows[self.alive[rows]]
+        if not len(rows):
+            return []
+        scores = self._approximate_scores(rows, query)
+        fetch = min(len(rows), k * self.rescore_factor)
+        best = rows[np.argpartition(-scores, fetch - 1)[:fetch]]
+        best.sort()
+        exact = np.asarray(self.vectors[best]) @ query
+        order = np.argsort(-exact)[:k]
+        return [(int(best[i]), float(exact[i])) for i in order]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        results = []
+        with self.lock:
+            for row, score in self._search(query, k):
+                point_id, content, metadata = self.connection.execute(
+                    "SELECT id, content, metadata FROM points WHERE row = ?", (row,)
+                ).fetchone()
+                metadata = {**json.loads(metadata), "_id": point_id}
+                results.append(
+                    (Document(page_content=content, metadata=metadata), score)
+                )
+        return results
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self.embedding.embed_query(query), k
+        )
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            document
+            for document, _ in self.similarity_search_with_score_by_vector(embedding, k)
+        ]
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: (score + 1) / 2
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        directory: Path,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorIndex":
+        index = cls.open(directory, embedding, **kwargs)
+        index.clear()
+        index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
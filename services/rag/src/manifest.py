@@ -0,0 +1,95 @@
+import hashlib
+import json
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(file_name: str, chunk_hash: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_name}/{chunk_hash}"))
+
+
+class Manifest:
+    """File and chunk content hashes of everything stored in the collection.
+
+    Point ids are derived from (file name, chunk hash), so a chunk that did not
+    change keeps its point and is never embedded again. A file is marked
+    complete only after all of its chunks were upserted; until then its entry
+    lists every chunk already committed, which is what lets an interrupted
+    ingest resume from the last saved batch.
+    """
+
+    def __init__(self, path: Path, files: Dict[str, dict]) -> None:
+        self.path = path
+        self.files = files
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        if not path.exists():
+            return cls(path, {})
+        return cls(path, json.loads(path.read_text())["files"])
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"files": self.files}))
+        tmp_path.replace(self.path)
+
+    def is_current(self, file_name: str, digest: str) -> bool:
+        entry = self.files.get(file_name)
+        return (
+            entry is not None
+            and entry["hash"] == digest
+            and entry.get("complete", True)
+        )
+
+    def chunk_hashes(self, file_name: str) -> List[str]:
+        return list(self.files.get(file_name, {"chunks": []})["chunks"])
+
+    def chunk_ids(self, file_name: str) -> List[str]:
+        return [
+            chunk_id(file_name, chunk_hash)
+            for chunk_hash in self.chunk_hashes(file_name)
+        ]
+
+    def start(self, file_name: str, digest: str) -> None:
+        self.files[file_name] = {
+            "hash": digest,
+            "chunks": self.chunk_hashes(file_name),
+            "complete": False,
+        }
+
+    def commit(self, file_name: str, chunk_hashes: Iterable[str]) -> None:
+        self.files[file_name]["chunks"].extend(chunk_hashes)
+
+    def finish(self, file_name: str, chunk_hashes: Iterable[str]) -> None:
+        entry = self.files[file_name]
+        entry["chunks"] = list(chunk_hashes)
+        entry["complete"] = True
+
+    def remove(self, file_name: str) -> List[str]:
+        ids = self.chunk_ids(file_name)
+        del self.files[file_name]
+        return ids
+
+
+def collection_version(manifest_path: Path) -> str:
+    """Changes whenever an ingest commits anything to the collection."""
+    try:
+        return str(manifest_path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return ""
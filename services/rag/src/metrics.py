@@ -0,0 +1,279 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .config import Config
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Adds ``seconds`` to ``stage`` of the request running in this context."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+class RequestTimer:
+    """Per-request stage timings built from ``astream_events`` (v2) events.
+
+    Stages that are runs of their own (retrieval, the chat model) are timed
+    from their start and end events. Work inside the retriever that is not a
+    run (query embedding, search, rerank, filter) is reported through
+    ``record_stage``, which reaches this timer through a context variable that
+    also follows the retriever into its thread pools.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self._started: Dict[str, float] = {}
+        self._first_token: Optional[float] = None
+        self._tokens = 0
+        self._token = _request_timings.set(self.timings)
+
+    def observe(self, event: dict) -> None:
+        now = time.perf_counter()
+        event_type, name = event["event"], event["name"]
+        if "answer_cache" in event.get("tags", []):
+            self.values["answer_cache_hit"] = 1
+        if event_type == "on_retriever_start" and name == "context_retriever":
+            self._started["retrieve"] = now
+        elif event_type == "on_retriever_end" and name == "context_retriever":
+            self._stop("retrieve", now)
+        elif event_type == "on_chat_model_start":
+            self._started["generate"] = now
+        elif event_type == "on_chat_model_stream" and event["data"]["chunk"].content:
+            self._tokens += 1
+            if self._first_token is None:
+                self._first_token = now
+                self.timings["time_to_first_token"] = now - self.start
+        elif event_type == "on_chat_model_end":
+            self._stop("generate", now)
+            usage = getattr(event["data"].get("output"), "usage_metadata", None)
+            if usage and usage.get("output_tokens"):
+                self._tokens = usage["output_tokens"]
+            self.values["output_tokens"] = self._tokens
+            if self._first_token is not None and now > self._first_token:
+                self.values["tokens_per_second"] = self._tokens / (
+                    now - self._first_token
+                )
+        elif event_type == "on_chain_stream" and name == "chain_answer":
+            if self._first_token is None:
+                self._first_token = now
+                self.timings["time_to_first_token"] = now - self.start
+        elif event_type == "on_custom_event" and name == "context_packed":
+            self.values["context_tokens"] = event["data"]["tokens_out"]
+            self.values["context_tokens_saved"] = event["data"]["tokens_saved"]
+
+    def _stop(self, stage: str, now: float) -> None:
+        started = self._started.pop(stage, None)
+        if started is not None:
+            self.timings[stage] = self.timings.get(stage, 0.0) + now - started
+
+    def finish(self) -> Dict[str, float]:
+        self.timings["total"] = time.perf_counter() - self.start
+        try:
+            _request_timings.reset(self._token)
+        except ValueError:
+            # Finished in another context, e.g. by the loop closing an
+            # abandoned stream; that context never saw the timer.
+            pass
+        return {
+            **{f"{stage}_seconds": round(s, 4) for stage, s in self.timings.items()},
+            **{name: round(value, 2) for name, value in self.values.items()},
+        }
+
+
+class MetricsRegistry:
+    """Aggregate histograms of request stage timings, dumped to a file.
+
+    The file is Prometheus text exposition format, or JSON when its name ends
+    in ``.json``, and is rewritten after every request.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, List[int]] = {}
+        self.sums: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.value_sums: Dict[str, float] = {}
+        self.value_counts: Dict[str, int] = {}
+
+    def observe(self, timings: Dict[str, float]) -> None:
+        with self.lock:
+            for name, value in timings.items():
+                if not name.endswith("_seconds"):
+                    self.value_sums[name] = self.value_sums.get(name, 0.0) + value
+                    self.value_counts[name] = self.value_counts.get(name, 0) + 1
+                    continue
+                stage = name[: -len("_seconds")]
+                buckets = self.histograms.setdefault(stage, [0] * len(BUCKETS))
+                for i, bound in enumerate(BUCKETS):
+                    if value <= bound:
+                        buckets[i] += 1
+                self.sums[stage] = self.sums.get(stage, 0.0) + value
+                self.counts[stage] = self.counts.get(stage, 0) + 1
+            if self.path is not None:
+                self._write()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        return {
+            "stages": {
+                stage: {
+                    "count": self.counts[stage],
+                    "mean_seconds": round(self.sums[stage] / self.counts[stage], 4),
+                    "buckets": dict(zip(map(str, BUCKETS), buckets)),
+                }
+                for stage, buckets in self.histograms.items()
+            },
+            "values": {
+                name: {
+                    "count": self.value_counts[name],
+                    "sum": round(total, 2),
+                    "mean": round(total / self.value_counts[name], 2),
+                }
+                for name, total in self.value_sums.items()
+            },
+        }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP rag_stage_seconds Time spent per request stage.",
+            "# TYPE rag_stage_seconds histogram",
+        ]
+        for stage, buckets in self.histograms.items():
+            for bound, count in zip(BUCKETS, buckets):
+                lines.append(
+                    f'rag_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'rag_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} '
+                f"{self.counts[stage]}"
+            )
+            lines.append(f'rag_stage_seconds_sum{{stage="{stage}"}} {self.sums[stage]}')
+            lines.append(
+                f'rag_stage_seconds_count{{stage="{stage}"}} {self.counts[stage]}'
+            )
+        for name, total in self.value_sums.items():
+            lines.append(f"# TYPE rag_{name} summary")
+            lines.append(f"rag_{name}_sum {total}")
+            lines.append(f"rag_{name}_count {self.value_counts[name]}")
+        return "\n".join(lines) + "\n"
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        if self.path.suffix == ".json":
+            content = json.dumps(self._snapshot(), indent=2)
+        else:
+            content = self.prometheus()
+        tmp_path.write_text(content)
+        tmp_path.replace(self.path)
+
+
+class SlowRequestProfiler:
+    """Profiles requests and keeps the profiles of those slower than a threshold.
+
+    Uses pyinstrument when installed and asked for (it follows ``await``s),
+    otherwise cProfile. Only one request is profiled at a time.
+    """
+
+    def __init__(self, directory: Path, threshold_seconds: float, tool: str) -> None:
+        self.directory = directory
+        self.threshold_seconds = threshold_seconds
+        self.tool = tool
+        self.lock = threading.Lock()
+
+    def start(self) -> Optional[object]:
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            if self.tool == "pyinstrument":
+                from pyinstrument import Profiler
+
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+            else:
+                import cProfile
+
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return profiler
+        except Exception:
+            self.lock.release()
+            raise
+
+    def stop(self, profiler: Optional[object], seconds: float) -> Optional[Path]:
+        if profiler is None:
+            return None
+        try:
+            if self.tool == "pyinstrument":
+                profiler.stop()
+            else:
+                profiler.disable()
+            if seconds < self.threshold_seconds:
+                return None
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stem = time.strftime("%Y%m%d-%H%M%S") + f"-{seconds:.2f}s"
+            if self.tool == "pyinstrument":
+                path = self.directory / f"{stem}.html"
+                path.write_text(profiler.output_html())
+            else:
+                path = self.directory / f"{stem}.prof"
+                profiler.dump_stats(str(path))
+            return path
+        finally:
+            self.lock.release()
+
+
+_metrics: Optional[MetricsRegistry] = None
+_profiler: Optional[SlowRequestProfiler] = None
+_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    global _metrics
+    with _lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry(
+                Config.Path.METRICS_FILE if Config.Metrics.WRITE_FILE else None
+            )
+        return _metrics
+
+
+def get_profiler() -> Optional[SlowRequestProfiler]:
+    global _profiler
+    if not Config.Metrics.PROFILE:
+        return None
+    with _lock:
+        if _profiler is None:
+            _profiler = SlowRequestProfiler(
+                Config.Path.PROFILES_DIR,
+                threshold_seconds=Config.Metrics.SLOW_REQUEST_SECONDS,
+                tool=Config.Metrics.PROFILER,
+            )
+        return _profiler
@@ -1,13 +1,54 @@
+import itertools
+import time
+from typing import Optional
+
 from langchain_community.chat_models import ChatOllama
 from langchain_community.document_compressors.flashrank_rerank import FlashrankRerank
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseLanguageModel
 from langchain_groq import ChatGroq
  
+from .batching import BatchedQueryEmbeddings, BatchedReranker
 from .config import Config
+from .embedding_cache import CachedEmbeddings, VectorCache
+from .llm_cache import CachedChatModel, ResponseCache
+from .registry import registry
  
  
 def create_llm() -> BaseLanguageModel:
+    return registry.get("llm", _load_llm)
+
+
+def create_fake_llm() -> BaseLanguageModel:
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+    return GenericFakeChatModel(messages=itertools.repeat(Config.Model.FAKE_ANSWER))
+
+
+def _load_llm() -> BaseLanguageModel:
+    llm = _load_chat_model()
+    # Identical prompts only get identical answers from a deterministic model,
+    # and canned fake answers must never end up in the cache of real ones.
+    if (
+        not Config.Cache.LLM_RESPONSES
+        or Config.Model.TEMPERATURE != 0
+        or Config.Model.USE_FAKE
+    ):
+        return llm
+    return CachedChatModel(
+        llm=llm,
+        response_cache=ResponseCache(
+            Config.Path.CACHE_DIR / "llm-responses.sqlite",
+            max_bytes=Config.Cache.LLM_RESPONSES_MAX_BYTES,
+        ),
+    )
+
+
+def _load_chat_model() -> BaseLanguageModel:
+    if Config.Model.USE_FAKE:
+        return create_fake_llm()
     if Config.Model.USE_LOCAL:
         return ChatOllama(
             model=Config.Model.LOCAL_LLM,
@@ -23,9 +64,71 @@ def create_llm() -> BaseLanguageModel:
         )
  
  
-def create_embeddings() -> FastEmbedEmbeddings:
-    return FastEmbedEmbeddings(model_name=Config.Model.EMBEDDINGS)
+def _create_fastembed(threads: Optional[int] = None) -> FastEmbedEmbeddings:
+    return registry.get(
+        f"fastembed/threads={threads}",
+        lambda: FastEmbedEmbeddings(
+            model_name=Config.Model.EMBEDDINGS, threads=threads
+        ),
+    )
+
+
+def _create_query_batcher(threads: Optional[int] = None) -> Embeddings:
+    if not Config.Batching.ENABLED:
+        return _create_fastembed(threads)
+    return registry.get(
+        f"query_batcher/threads={threads}",
+        lambda: BatchedQueryEmbeddings(
+            _create_fastembed(threads),
+            max_batch_size=Config.Batching.MAX_BATCH_SIZE,
+            max_wait_ms=Config.Batching.MAX_WAIT_MS,
+        ),
+    )
+
+
+def create_embeddings(
+    read_only_cache: bool = False, threads: Optional[int] = None
+) -> Embeddings:
+    return registry.get(
+        f"embeddings/read_only={read_only_cache}/threads={threads}",
+        lambda: CachedEmbeddings(
+            _create_query_batcher(threads),
+            model_name=Config.Model.EMBEDDINGS,
+            cache=VectorCache.open(
+                Config.Path.CACHE_DIR / "embeddings",
+                max_items=Config.Cache.EMBEDDINGS_MAX_ITEMS,
+                read_only=read_only_cache,
+            ),
+        ),
+    )
  
  
-def create_reranker() -> FlashrankRerank:
-    return FlashrankRerank(model=Config.Model.RERANKER)
\ No newline at end of file
+def create_reranker() -> BaseDocumentCompressor:
+    reranker = registry.get(
+        "reranker", lambda: FlashrankRerank(model=Config.Model.RERANKER)
+    )
+    if not Config.Batching.ENABLED:
+        return reranker
+    return registry.get(
+        "reranker/batched",
+        lambda: BatchedReranker(
+            reranker=reranker,
+            max_batch_size=Config.Batching.MAX_BATCH_SIZE,
+            max_wait_ms=Config.Batching.MAX_WAIT_MS,
+        ),
+    )
+ 
+ 
+def warm_up_models() -> None:
+    """Loads every model and runs one tiny inference so the first question is fast."""
+    start = time.perf_counter()
+    _create_fastembed().embed_query("warm up")
+    registry.record_warm_up("fastembed/threads=None", time.perf_counter() - start)
+    create_embeddings()
+    if Config.Retriever.USE_RERANKER:
+        start = time.perf_counter()
+        create_reranker().compress_documents(
+            [Document(page_content="warm up")], "warm up"
+        )
+        registry.record_warm_up("reranker", time.perf_counter() - start)
+    create_llm()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+def current_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (ImportError, OSError, IndexError, ValueError):
+        return None
+
+
+class ModelRegistry:
+    """Process-wide, thread-safe store of loaded models.
+
+    Each model is built once by its factory; concurrent callers asking for a
+    model that is still loading wait for that load instead of starting another.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[str, Any] = {}
+        self._metrics: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name in self._models:
+            return self._models[name]
+        with self._lock:
+            model_lock = self._locks.setdefault(name, threading.Lock())
+        with model_lock:
+            if name not in self._models:
+                rss_before = current_rss_bytes()
+                start = time.perf_counter()
+                model = factory()
+                rss_after = current_rss_bytes()
+                self._metrics[name] = {
+                    "load_seconds": round(time.perf_counter() - start, 3),
+                    "rss_delta_mb": (
+                        round((rss_after - rss_before) / 2**20, 1)
+                        if rss_before is not None and rss_after is not None
+                        else None
+                    ),
+                }
+                self._models[name] = model
+        return self._models[name]
+
+    def record_warm_up(self, name: str, seconds: float) -> None:
+        self._metrics.setdefault(name, {})["warm_up_seconds"] = round(seconds, 3)
+
+    def metrics(self) -> Dict[str, dict]:
+        return {name: dict(metrics) for name, metrics in self._metrics.items()}
+
+
+registry = ModelRegistry()
@@ -0,0 +1,152 @@
+import re
+from typing import List, Literal, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+BATCH_PROMPT = PromptTemplate.from_template(
+    """Below are numbered candidate passages and a question.
+List the numbers of every passage that contains information relevant to
+answering the question, separated by commas. If none is relevant, answer NONE.
+Answer with the numbers only.
+
+Question: {question}
+
+{candidates}
+
+Relevant passages:"""
+)
+
+SINGLE_PROMPT = PromptTemplate.from_template(
+    """Given the following question and context, return YES if the context is
+relevant to the question and NO if it isn't.
+
+> Question: {question}
+> Context:
+>>>
+{context}
+>>>
+> Relevant (YES / NO):"""
+)
+
+
+class BatchedLLMFilter(BaseDocumentCompressor):
+    """Drops irrelevant documents with at most one LLM round-trip.
+
+    Documents the reranker already scored at or above ``keep_score`` are kept
+    and those at or below ``drop_score`` are dropped without asking the LLM.
+    The rest are judged either together in a single numbered prompt
+    (``mode="batch"``) or with one prompt each sent concurrently
+    (``mode="parallel"``, capped by ``max_concurrency``). A batch answer drops
+    everything only when it is just NONE; unparseable answers keep the
+    documents in question.
+    """
+
+    llm: BaseLanguageModel
+    mode: Literal["batch", "parallel"] = "batch"
+    max_concurrency: int = 4
+    keep_score: Optional[float] = None
+    drop_score: Optional[float] = None
+    max_chars: int = 2000
+
+    def _triage(
+        self, documents: Sequence[Document]
+    ) -> Tuple[List[bool], List[int]]:
+        keep, undecided = [False] * len(documents), []
+        for i, document in enumerate(documents):
+            score = document.metadata.get("relevance_score")
+            if score is not None and self.keep_score is not None:
+                if score >= self.keep_score:
+                    keep[i] = True
+                    continue
+            if score is not None and self.drop_score is not None:
+                if score <= self.drop_score:
+                    continue
+            undecided.append(i)
+        return keep, undecided
+
+    def _batch_input(self, documents: List[Document], question: str) -> dict:
+        candidates = "\n\n".join(
+            f"[{i + 1}] {document.page_content[: self.max_chars]}"
+            for i, document in enumerate(documents)
+        )
+        return {"question": question, "candidates": candidates}
+
+    @staticmethod
+    def _parse_batch(answer: str, count: int) -> List[bool]:
+        numbers = {int(number) for number in re.findall(r"\d+", answer)}
+        if numbers & set(range(1, count + 1)):
+            return [i + 1 in numbers for i in range(count)]
+        if re.fullmatch(r"\W*NONE\W*", answer, re.IGNORECASE):
+            return [False] * count
+        return [True] * count
+
+    @staticmethod
+    def _parse_single(answer: str) -> bool:
+        return not re.match(r"\s*NO\b", answer, re.IGNORECASE)
+
+    def _single_inputs(self, documents: List[Document], question: str) -> List[dict]:
+        return [
+            {"question": question, "context": document.page_content[: self.max_chars]}
+            for document in documents
+        ]
+
+    @staticmethod
+    def _apply(
+        documents: Sequence[Document],
+        keep: List[bool],
+        undecided: List[int],
+        verdicts: List[bool],
+    ) -> List[Document]:
+        for i, verdict in zip(undecided, verdicts):
+            keep[i] = verdict
+        return [document for document, kept in zip(documents, keep) if kept]
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        keep, undecided = self._triage(documents)
+        if not undecided:
+            return self._apply(documents, keep, [], [])
+        pending = [documents[i] for i in undecided]
+        config = {"callbacks": callbacks, "max_concurrency": self.max_concurrency}
+        if self.mode == "batch":
+            chain = BATCH_PROMPT | self.llm | StrOutputParser()
+            answer = chain.invoke(self._batch_input(pending, query), config=config)
+            verdicts = self._parse_batch(answer, len(pending))
+        else:
+            chain = SINGLE_PROMPT | self.llm | StrOutputParser()
+            answers = chain.batch(self._single_inputs(pending, query), config=config)
+            verdicts = [self._parse_single(answer) for answer in answers]
+        return self._apply(documents, keep, undecided, verdicts)
+
+    async def acompress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        keep, undecided = self._triage(documents)
+        if not undecided:
+            return self._apply(documents, keep, [], [])
+        pending = [documents[i] for i in undecided]
+        config = {"callbacks": callbacks, "max_concurrency": self.max_concurrency}
+        if self.mode == "batch":
+            chain = BATCH_PROMPT | self.llm | StrOutputParser()
+            answer = await chain.ainvoke(
+                self._batch_input(pending, query), config=config
+            )
+            verdicts = self._parse_batch(answer, len(pending))
+        else:
+            chain = SINGLE_PROMPT | self.llm | StrOutputParser()
+            answers = await chain.abatch(
+                self._single_inputs(pending, query), config=config
+            )
+            verdicts = [self._parse_single(answer) for answer in answers]
+        return self._apply(documents, keep, undecided, verdicts)
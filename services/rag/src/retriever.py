@@ -1,37 +1,166 @@
-from typing import Optional
+from concurrent.futures import Executor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
  
-from langchain.retrievers import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors.chain_filter import LLMChainFilter
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+    Callbacks,
+)
+from langchain_core.documents import BaseDocumentCompressor, Document
 from langchain_core.language_models import BaseLanguageModel
-from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
-from langchain_qdrant import Qdrant
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables.config import ContextThreadPoolExecutor, run_in_executor
+from langchain_core.vectorstores import VectorStore
  
+from .bm25 import BM25Index
 from .config import Config
+from .metrics import timed_stage
 from .model import create_embeddings, create_reranker
+from .relevance_filter import BatchedLLMFilter
+from .vector_store import open_vector_store
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses dense and BM25 results with reciprocal-rank fusion."""
+
+    vector_store: VectorStore
+    index: BM25Index
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        rankings = [
+            self.vector_store.similarity_search(query, k=self.fetch_k),
+            [document for document, _ in self.index.search(query, self.fetch_k)],
+        ]
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, document in enumerate(ranking):
+                key = document.metadata.get("_id", document.page_content)
+                scores[key] = scores.get(key, 0.0) + 1 / (self.rrf_k + rank + 1)
+                documents.setdefault(key, document)
+        fused = sorted(scores, key=scores.get, reverse=True)[: self.k]
+        return [documents[key] for key in fused]
+
+
+@lru_cache(maxsize=None)
+def retrieval_executor(name: str, workers: int) -> ContextThreadPoolExecutor:
+    # Copies the caller's context so request timings follow into the pool.
+    return ContextThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+
+def _pool_size(workers: int) -> int:
+    # With batching on, the pool threads mostly wait for a batcher, which does
+    # the work in one thread, and a batch holds at most one request per thread.
+    if Config.Batching.ENABLED:
+        return Config.Batching.POOL_SIZE
+    return workers
+
+
+class AsyncRetriever(BaseRetriever):
+    """Search, rerank and filter with a native async path.
+
+    The blocking vector/BM25 search and the ONNX rerank run on their own
+    bounded thread pools, so concurrent sessions only wait for a free worker
+    instead of for each other on the event loop. The LLM filter is awaited.
+    """
+
+    base_retriever: BaseRetriever
+    reranker: Optional[BaseDocumentCompressor] = None
+    document_filter: Optional[BaseDocumentCompressor] = None
+    search_executor: Executor
+    rerank_executor: Executor
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        documents = self._search(query, run_manager.get_child())
+        if documents and self.reranker:
+            documents = self._rerank(documents, query, run_manager.get_child())
+        if documents and self.document_filter:
+            with timed_stage("filter"):
+                documents = self.document_filter.compress_documents(
+                    documents, query, callbacks=run_manager.get_child()
+                )
+        return list(documents)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        callbacks = run_manager.get_sync().get_child()
+        documents = await run_in_executor(
+            self.search_executor, self._search, query, callbacks
+        )
+        if documents and self.reranker:
+            documents = await run_in_executor(
+                self.rerank_executor, self._rerank, documents, query, callbacks
+            )
+        if documents and self.document_filter:
+            with timed_stage("filter"):
+                documents = await self.document_filter.acompress_documents(
+                    documents, query, callbacks=run_manager.get_child()
+                )
+        return list(documents)
+
+    def _search(self, query: str, callbacks: Callbacks) -> List[Document]:
+        with timed_stage("search"):
+            return self.base_retriever.invoke(query, config={"callbacks": callbacks})
+
+    def _rerank(
+        self, documents: List[Document], query: str, callbacks: Callbacks
+    ) -> List[Document]:
+        with timed_stage("rerank"):
+            return list(
+                self.reranker.compress_documents(documents, query, callbacks=callbacks)
+            )
  
  
 def create_retriever(
-    llm: BaseLanguageModel, vector_store: Optional[VectorStore] = None
-) -> VectorStoreRetriever:
+    llm: BaseLanguageModel,
+    vector_store: Optional[VectorStore] = None,
+    database_dir: Optional[Path] = None,
+) -> AsyncRetriever:
+    database_dir = database_dir or Config.Path.DATABASE_DIR
     if not vector_store:
-        vector_store = Qdrant.from_existing_collection(
-            embedding=create_embeddings(),
-            collection_name=Config.Database.DOCUMENTS_COLLECTION,
-            path=Config.Path.DATABASE_DIR,
-        )
+        vector_store = open_vector_store(create_embeddings(), database_dir)
  
-    retriever = vector_store.as_retriever(
-        search_type="similarity", search_kwargs={"k": 5}
-    )
- 
-    if Config.Retriever.USE_RERANKER:
-        retriever = ContextualCompressionRetriever(
-            base_compressor=create_reranker(), base_retriever=retriever
+    if Config.Retriever.MODE == "hybrid":
+        retriever = HybridRetriever(
+            vector_store=vector_store,
+            index=BM25Index(database_dir / Config.Database.BM25_FILE),
+            k=Config.Retriever.K,
+            fetch_k=Config.Retriever.HYBRID_FETCH_K,
+            rrf_k=Config.Retriever.RRF_K,
         )
- 
-    if Config.Retriever.USE_CHAIN_FILTER:
-        retriever = ContextualCompressionRetriever(
-            base_compressor=LLMChainFilter.from_llm(llm), base_retriever=retriever
+    else:
+        retriever = vector_store.as_retriever(
+            search_type="similarity", search_kwargs={"k": Config.Retriever.K}
         )
  
-    return retriever
\ No newline at end of file
+    return AsyncRetriever(
+        base_retriever=retriever,
+        reranker=create_reranker() if Config.Retriever.USE_RERANKER else None,
+        document_filter=(
+            BatchedLLMFilter(
+                llm=llm,
+                mode=Config.Retriever.FILTER_MODE,
+                max_concurrency=Config.Retriever.FILTER_MAX_CONCURRENCY,
+                keep_score=Config.Retriever.FILTER_KEEP_SCORE,
+                drop_score=Config.Retriever.FILTER_DROP_SCORE,
+            )
+            if Config.Retriever.USE_CHAIN_FILTER
+            else None
+        ),
+        search_executor=retrieval_executor(
+            "retriever-search", _pool_size(Config.Retriever.SEARCH_CONCURRENCY)
+        ),
+        rerank_executor=retrieval_executor(
+            "retriever-rerank", _pool_size(Config.Retriever.RERANK_CONCURRENCY)
+        ),
+    )
\ No newline at end of file
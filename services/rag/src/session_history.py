@@ -1,9 +1,225 @@
-from langchain_community.chat_message_histories import ChatMessageHistory
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence
 
-store = {}
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    message_to_dict,
+    messages_from_dict,
+)
 
+from .config import Config
+from .context_packer import estimate_tokens
 
-def get_session_history(session_id: str) -> ChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
\ No newline at end of file
+
+class StoredChatMessageHistory(BaseChatMessageHistory):
+    """Messages of one session, kept in memory and written through to the store."""
+
+    def __init__(
+        self, store: "SessionStore", session_id: str, messages: List[BaseMessage]
+    ) -> None:
+        self.store = store
+        self.session_id = session_id
+        self._messages = messages
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return list(self._messages)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.store.append(self, list(messages))
+
+    def clear(self) -> None:
+        self.store.clear(self)
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """Read view holding only the latest messages that fit in ``max_tokens``.
+
+    The window always starts at a human message so the model never sees an
+    answer without its question. Writes go to the full history.
+    """
+
+    def __init__(self, history: BaseChatMessageHistory, max_tokens: int) -> None:
+        self.history = history
+        self.max_tokens = max_tokens
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        messages = self.history.messages
+        start, used = len(messages), 0
+        while start > 0:
+            cost = estimate_tokens(str(messages[start - 1].content))
+            if used + cost > self.max_tokens:
+                break
+            used += cost
+            start -= 1
+        while start < len(messages) and not isinstance(messages[start], HumanMessage):
+            start += 1
+        return messages[start:]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        self.history.clear()
+
+
+class SessionStore:
+    """Chat histories with LRU and idle-time eviction.
+
+    At most ``max_sessions`` histories are kept in memory, each trimmed to its
+    latest ``max_messages``, and sessions idle for ``ttl_seconds`` expire. With
+    a ``path`` the messages are also stored in SQLite, so a session evicted
+    from memory (or from a restarted process) is reloaded on its next turn.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        ttl_seconds: float,
+        max_messages: int,
+        path: Optional[Path] = None,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.sessions: "OrderedDict[str, StoredChatMessageHistory]" = OrderedDict()
+        self.last_used: dict = {}
+        self.lock = threading.RLock()
+        self.connection = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    session_id TEXT, position INTEGER, message TEXT,
+                    PRIMARY KEY (session_id, position)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY, last_used REAL
+                );
+                CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used);
+                """)
+
+    def get(self, session_id: str) -> StoredChatMessageHistory:
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            history = self.sessions.get(session_id)
+            if history is None:
+                history = StoredChatMessageHistory(
+                    self, session_id, self._load(session_id)
+                )
+                self.sessions[session_id] = history
+            self.sessions.move_to_end(session_id)
+            self._touch(session_id, now)
+            while len(self.sessions) > self.max_sessions:
+                evicted, _ = self.sessions.popitem(last=False)
+                del self.last_used[evicted]
+            return history
+
+    def append(
+        self, history: StoredChatMessageHistory, messages: List[BaseMessage]
+    ) -> None:
+        with self.lock:
+            start = self._position(history.session_id)
+            history._messages.extend(messages)
+            del history._messages[: -self.max_messages]
+            if self.connection is None:
+                return
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO messages VALUES (?, ?, ?)",
+                    [
+                        (history.session_id, start + i, json.dumps(message_to_dict(m)))
+                        for i, m in enumerate(messages)
+                    ],
+                )
+                self.connection.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND position < ?",
+                    (history.session_id, start + len(messages) - self.max_messages),
+                )
+
+    def clear(self, history: StoredChatMessageHistory) -> None:
+        with self.lock:
+            history._messages.clear()
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute(
+                        "DELETE FROM messages WHERE session_id = ?",
+                        (history.session_id,),
+                    )
+
+    def _position(self, session_id: str) -> int:
+        if self.connection is None:
+            return 0
+        (position,) = self.connection.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM messages WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        return position
+
+    def _load(self, session_id: str) -> List[BaseMessage]:
+        if self.connection is None:
+            return []
+        rows = self.connection.execute(
+            "SELECT message FROM messages WHERE session_id = ? ORDER BY position",
+            (session_id,),
+        ).fetchall()
+        return messages_from_dict([json.loads(message) for (message,) in rows])
+
+    def _touch(self, session_id: str, now: float) -> None:
+        self.last_used[session_id] = now
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sessions VALUES (?, ?)", (session_id, now)
+                )
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        expired = [sid for sid, used in self.last_used.items() if used < cutoff]
+        for session_id in expired:
+            del self.last_used[session_id]
+            self.sessions.pop(session_id, None)
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM messages WHERE session_id IN "
+                    "(SELECT session_id FROM sessions WHERE last_used < ?)",
+                    (cutoff,),
+                )
+                self.connection.execute(
+                    "DELETE FROM sessions WHERE last_used < ?", (cutoff,)
+                )
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(
+                max_sessions=Config.Session.MAX_SESSIONS,
+                ttl_seconds=Config.Session.TTL_SECONDS,
+                max_messages=Config.Session.MAX_MESSAGES,
+                path=Config.Path.SESSIONS_FILE if Config.Session.PERSIST else None,
+            )
+        return _store
+
+
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    return WindowedChatMessageHistory(
+        get_session_store().get(session_id),
+        max_tokens=Config.Session.HISTORY_TOKEN_LIMIT,
+    )
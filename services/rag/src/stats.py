@@ -0,0 +1,11 @@
+from typing import List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank ``q``-th percentile of ``values``.
+
+    Kept free of ``Config`` so benchmarks can import it before they set
+    ``APP_HOME``.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
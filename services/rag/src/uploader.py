@@ -1,23 +1,91 @@
+import hashlib
+import os
 import shutil
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
 
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 from .config import Config
 
+CHUNK_SIZE = 1024 * 1024
+BLOB_NAME = "content"
+
+
+class StoredFile(NamedTuple):
+    name: str
+    digest: str
+    path: Path
+    duplicate: bool
+
+
+def store_blob(file: BinaryIO, directory: Path) -> Tuple[str, Path, bool]:
+    """Streams ``file`` to ``directory/<sha256>/content``, hashing it on the way.
+
+    Returns the digest, the blob path and whether the blob was already stored,
+    in which case the new copy is discarded: each content is stored once.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    with tempfile.NamedTemporaryFile(
+        dir=directory, suffix=".part", delete=False
+    ) as tmp_file:
+        try:
+            while chunk := file.read(CHUNK_SIZE):
+                digest.update(chunk)
+                tmp_file.write(chunk)
+        except BaseException:
+            os.unlink(tmp_file.name)
+            raise
+    blob = directory / digest.hexdigest() / BLOB_NAME
+    if blob.exists():
+        os.unlink(tmp_file.name)
+        # Stored again just now, which keeps it from garbage collection.
+        os.utime(blob.parent)
+        return blob.parent.name, blob, True
+    blob.parent.mkdir(exist_ok=True)
+    os.replace(tmp_file.name, blob)
+    return blob.parent.name, blob, False
+
+
+def link_name(blob: Path, name: str) -> Path:
+    """Gives ``blob`` the file name ``name`` without storing its bytes again.
+
+    Documents are told apart by file name once ingested, so the ingestor reads
+    the blob through this hard link (a copy where links are not supported).
+    """
+    path = blob.parent / Path(name).name
+    if not path.exists():
+        try:
+            os.link(blob, path)
+        except OSError:
+            shutil.copyfile(blob, path)
+    return path
+
 
 def upload_files(
-    files: List[UploadedFile], remove_old_files: bool = True
-) -> List[Path]:
-    if remove_old_files:
-        shutil.rmtree(Config.Path.DATABASE_DIR, ignore_errors=True)
-        shutil.rmtree(Config.Path.DOCUMENTS_DIR, ignore_errors=True)
-    Config.Path.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
-    file_paths = []
+    files: List[UploadedFile], directory: Optional[Path] = None
+) -> List[StoredFile]:
+    """Stores the uploads, dropping byte-identical repeats among them.
+
+    Each file is hashed before it gets a name, so a repeat is dropped without
+    touching the disk again. Different files uploaded under the same name are
+    renamed ``name (2).pdf`` and so on.
+    """
+    directory = directory or Config.Path.DOCUMENTS_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    stored, digests, names = [], set(), set()
     for file in files:
-        file_path = Config.Path.DOCUMENTS_DIR / file.name
-        with file_path.open("wb") as f:
-            f.write(file.getvalue())
-        file_paths.append(file_path)
-    return file_paths
\ No newline at end of file
+        digest, blob, duplicate = store_blob(file, directory)
+        if digest in digests:
+            continue
+        digests.add(digest)
+        original = Path(file.name)
+        name, copies = original.name, 1
+        while name in names:
+            copies += 1
+            name = f"{original.stem} ({copies}){original.suffix}"
+        names.add(name)
+        stored.append(StoredFile(name, digest, link_name(blob, name), duplicate))
+    return stored
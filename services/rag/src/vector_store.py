@@ -0,0 +1,72 @@
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from .config import Config
+
+BACKENDS = ("qdrant", "flat", "ivf")
+
+
+def _backend() -> str:
+    backend = Config.Database.BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector store backend: {backend}")
+    return backend
+
+
+def _open_local_index(embeddings: Embeddings, directory: Path) -> VectorStore:
+    from .local_index import LocalVectorIndex
+
+    return LocalVectorIndex.open(
+        directory / Config.Database.LOCAL_INDEX_DIR,
+        embeddings,
+        quantization=Config.Database.QUANTIZATION,
+        rescore_factor=Config.Database.RESCORE_FACTOR,
+        ivf=_backend() == "ivf",
+        ivf_lists=Config.Database.IVF_LISTS,
+        ivf_probes=Config.Database.IVF_PROBES,
+        ivf_min_train=Config.Database.IVF_MIN_TRAIN,
+    )
+
+
+def create_vector_store(
+    documents: List[Document],
+    ids: List[str],
+    embeddings: Embeddings,
+    directory: Optional[Path] = None,
+) -> VectorStore:
+    """Replace the collection in ``directory`` (the database dir by default)."""
+    directory = directory or Config.Path.DATABASE_DIR
+    if _backend() == "qdrant":
+        from langchain_qdrant import Qdrant
+
+        return Qdrant.from_documents(
+            documents=documents,
+            ids=ids,
+            embedding=embeddings,
+            path=directory,
+            collection_name=Config.Database.DOCUMENTS_COLLECTION,
+            force_recreate=True,
+        )
+    vector_store = _open_local_index(embeddings, directory)
+    vector_store.clear()
+    vector_store.add_documents(documents, ids=ids)
+    return vector_store
+
+
+def open_vector_store(
+    embeddings: Embeddings, directory: Optional[Path] = None
+) -> VectorStore:
+    directory = directory or Config.Path.DATABASE_DIR
+    if _backend() == "qdrant":
+        from langchain_qdrant import Qdrant
+
+        return Qdrant.from_existing_collection(
+            embedding=embeddings,
+            path=directory,
+            collection_name=Config.Database.DOCUMENTS_COLLECTION,
+        )
+    return _open_local_index(embeddings, directory)
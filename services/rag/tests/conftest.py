@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Config reads APP_HOME when it is imported, so point it at a scratch
+# directory before any test module imports src.
+os.environ.setdefault("APP_HOME", tempfile.mkdtemp(prefix="rag-tests-"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
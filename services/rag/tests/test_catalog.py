@@ -0,0 +1,36 @@
+import os
+import time
+
+from src.catalog import CollectionCatalog
+
+
+def store(documents_dir, digest, size, age=0.0):
+    blob = documents_dir / digest
+    blob.mkdir(parents=True)
+    (blob / "content").write_bytes(b"x" * size)
+    os.link(blob / "content", blob / "name.pdf")
+    modified = time.time() - age
+    os.utime(blob, (modified, modified))
+
+
+def test_uploads_count_against_the_budget(tmp_path):
+    documents_dir = tmp_path / "tmp"
+    catalog = CollectionCatalog(tmp_path / "collections", 1500, documents_dir, 60)
+    for collection, digest in (("old", "a" * 64), ("new", "b" * 64)):
+        store(documents_dir, digest, 1000, age=120)
+        catalog.open(collection, {"name.pdf": digest})
+        catalog.mark_ready(collection)
+        catalog.in_use.discard(collection)
+
+    assert catalog.collect_garbage() == ["old"]
+    assert sorted(p.name for p in documents_dir.iterdir()) == ["b" * 64]
+
+
+def test_keeps_recent_uploads_no_collection_refers_to_yet(tmp_path):
+    documents_dir = tmp_path / "tmp"
+    catalog = CollectionCatalog(tmp_path / "collections", 0, documents_dir, 60)
+    store(documents_dir, "a" * 64, 10, age=120)
+    store(documents_dir, "b" * 64, 10)
+
+    catalog.collect_garbage()
+    assert sorted(p.name for p in documents_dir.iterdir()) == ["b" * 64]
@@ -0,0 +1,18 @@
+from src.embedding_cache import VectorCache
+
+
+def test_a_model_with_another_dimension_starts_the_cache_over(tmp_path):
+    cache = VectorCache(tmp_path, max_items=10)
+    cache.put([b"a" * 16], [[1.0, 2.0, 3.0, 4.0]])
+    cache.put([b"b" * 16], [[1.0] * 8])
+
+    reopened = VectorCache(tmp_path, max_items=10)
+    assert reopened.get([b"a" * 16, b"b" * 16]) == [None, [1.0] * 8]
+
+
+def test_removes_the_index_left_by_the_old_format(tmp_path):
+    VectorCache(tmp_path, max_items=10).put([b"a" * 16], [[1.0, 2.0]])
+    (tmp_path / "index.npz").write_bytes(b"stale")
+
+    VectorCache(tmp_path, max_items=10)
+    assert not (tmp_path / "index.npz").exists()
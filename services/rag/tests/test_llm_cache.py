@@ -0,0 +1,35 @@
+from langchain_core.messages import HumanMessage
+from langchain_groq import ChatGroq
+
+from src.llm_cache import CachedChatModel, ResponseCache
+
+
+def cached(llm, tmp_path):
+    return CachedChatModel(
+        llm=llm,
+        response_cache=ResponseCache(tmp_path / "responses.sqlite", max_bytes=2**20),
+    )
+
+
+def groq(**kwargs):
+    return ChatGroq(api_key="offline", temperature=0, **kwargs)
+
+
+def test_models_of_one_provider_do_not_share_keys(tmp_path):
+    messages = [HumanMessage(content="What is RAG?")]
+    keys = {
+        cached(llm, tmp_path)._key(messages, None)
+        for llm in [
+            groq(model_name="llama3-8b-8192", max_tokens=256),
+            groq(model_name="llama3-70b-8192", max_tokens=256),
+            groq(model_name="llama3-8b-8192", max_tokens=512),
+        ]
+    }
+    assert len(keys) == 3
+
+
+def test_the_same_model_and_prompt_share_a_key(tmp_path):
+    messages = [HumanMessage(content="What is RAG?")]
+    first = cached(groq(model_name="llama3-8b-8192"), tmp_path)
+    second = cached(groq(model_name="llama3-8b-8192"), tmp_path)
+    assert first._key(messages, None) == second._key(messages, None)
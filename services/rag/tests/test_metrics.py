@@ -0,0 +1,11 @@
+from src.metrics import RequestTimer, record_stage
+
+
+def test_stages_after_finish_are_not_recorded_on_the_request():
+    timer = RequestTimer()
+    record_stage("search", 0.5)
+    timings = timer.finish()
+    record_stage("rerank", 0.5)
+
+    assert timings["search_seconds"] == 0.5
+    assert "rerank" not in timer.timings
@@ -0,0 +1,23 @@
+import pytest
+from langchain_core.language_models import FakeListLLM
+
+from src.relevance_filter import BatchedLLMFilter
+
+
+@pytest.mark.parametrize(
+    "answer, verdicts",
+    [
+        ("1, 3", [True, False, True]),
+        ("1, 3. None of the others are relevant.", [True, False, True]),
+        ("NONE", [False, False, False]),
+        (" none.", [False, False, False]),
+        ("I am not sure.", [True, True, True]),
+    ],
+)
+def test_parses_batch_answers(answer, verdicts):
+    assert BatchedLLMFilter._parse_batch(answer, 3) == verdicts
+
+
+def test_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        BatchedLLMFilter(llm=FakeListLLM(responses=["NONE"]), mode="serial")
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.runnables import RunnableLambda
+
+from server import RagServer
+from src.config import Config
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path):
+    """Fake LLM and embeddings, no reranker and no caches: nothing is downloaded."""
+    monkeypatch.setattr(Config.Model, "USE_FAKE", True)
+    monkeypatch.setattr(Config.Retriever, "USE_RERANKER", False)
+    monkeypatch.setattr(Config.Retriever, "USE_CHAIN_FILTER", False)
+    monkeypatch.setattr(Config.Retriever, "MODE", "dense")
+    monkeypatch.setattr(Config.Cache, "ANSWERS", False)
+    monkeypatch.setattr(Config.Database, "BACKEND", "flat")
+    return tmp_path
+
+
+def fake_chain(directory):
+    from src.chain import create_chain
+    from src.model import create_fake_llm
+    from src.retriever import create_retriever
+    from src.vector_store import create_vector_store
+
+    documents = [
+        Document(
+            page_content=f"Fact number {i} about retrieval.",
+            metadata={"source": "facts.pdf"},
+        )
+        for i in range(10)
+    ]
+    vector_store = create_vector_store(
+        documents,
+        [str(i) for i in range(10)],
+        DeterministicFakeEmbedding(size=32),
+        directory=directory,
+    )
+    llm = create_fake_llm()
+    return create_chain(
+        llm, create_retriever(llm, vector_store=vector_store, database_dir=directory)
+    )
+
+
+async def call(
+    server: RagServer, method: str, path: str, body: Optional[bytes] = None
+) -> Tuple[int, bytes]:
+    messages = [{"type": "http.request", "body": body or b"", "more_body": False}]
+    never = asyncio.Event()
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop(0)
+        await never.wait()
+        return {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    await server({"type": "http", "method": method, "path": path}, receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def parse_sse(body: bytes) -> List[Tuple[str, object]]:
+    events = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+def ask(question: str, **fields) -> bytes:
+    return json.dumps({"question": question, **fields}).encode("utf-8")
+
+
+def test_streams_sources_tokens_and_done(offline):
+    async def scenario():
+        server = RagServer(chain_factory=lambda: fake_chain(offline))
+        await server.startup()
+        return await call(
+            server, "POST", "/ask", ask("What is fact 3?", session_id="s1")
+        )
+
+    status, body = asyncio.run(scenario())
+    assert status == 200
+    events = parse_sse(body)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "sources"
+    assert kinds[-2:] == ["timings", "done"]
+    assert set(kinds[1:-2]) == {"token"}
+    sources = events[0][1]
+    assert sources and all(s["metadata"]["source"] == "facts.pdf" for s in sources)
+    answer = "".join(data["text"] for kind, data in events if kind == "token")
+    assert answer == Config.Model.FAKE_ANSWER
+    assert events[-1][1] == {"session_id": "s1"}
+
+
+def test_answers_with_one_json_object_without_streaming(offline):
+    async def scenario():
+        server = RagServer(chain_factory=lambda: fake_chain(offline))
+        await server.startup()
+        return await call(server, "POST", "/ask", ask("What is fact 3?", stream=False))
+
+    status, body = asyncio.run(scenario())
+    assert status == 200
+    response = json.loads(body)
+    assert response["answer"] == Config.Model.FAKE_ANSWER
+    assert response["sources"]
+
+
+@pytest.mark.parametrize(
+    "body", [b"not json", b"{}", b'{"session_id": "s1"}', ask("   "), b"[1]"]
+)
+def test_rejects_bad_input(offline, body):
+    async def scenario():
+        server = RagServer(chain_factory=lambda: None)
+        await server.startup()
+        return await call(server, "POST", "/ask", body)
+
+    status, response = asyncio.run(scenario())
+    assert status == 400
+    assert "error" in json.loads(response)
+
+
+def test_rejects_questions_once_the_queue_is_full(offline):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocked(_):
+            await release.wait()
+            return "answer"
+
+        server = RagServer(
+            chain_factory=lambda: RunnableLambda(blocked),
+            max_concurrency=1,
+            max_queue=1,
+        )
+        await server.startup()
+        running = asyncio.create_task(call(server, "POST", "/ask", ask("first")))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(call(server, "POST", "/ask", ask("second")))
+        await asyncio.sleep(0.05)
+        rejected = await call(server, "POST", "/ask", ask("third"))
+        release.set()
+        return rejected, await running, await queued
+
+    (status, body), running, queued = asyncio.run(scenario())
+    assert status == 503
+    assert json.loads(body) == {"error": "too many requests"}
+    assert running[0] == 200 and queued[0] == 200
+    assert parse_sse(running[1])[-1][0] == "done"
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import time
+
+from fake_client import FakeOpenAIClient
+from generator import BookGenerator
+from ratelimit import RateLimiter
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Time section generation against the fake API client"
+    )
+    parser.add_argument("--num-chapters", type=int, default=6)
+    parser.add_argument("--num-subsections", type=int, default=5)
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Workers of the concurrent run"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=1.0, help="Seconds per chat completion"
+    )
+    parser.add_argument(
+        "--image-latency", type=float, default=2.0, help="Seconds per image"
+    )
+    parser.add_argument("--rpm", type=int, default=500)
+    parser.add_argument("--tpm", type=int, default=30000)
+    return parser.parse_args()
+
+
+def time_sections(generator, plan, workers, rpm, tpm):
+    # A fresh limiter per run, so the second run does not pay for the first.
+    generator.wrapper.rate_limiter = RateLimiter(rpm, tpm)
+    start = time.perf_counter()
+    results = generator.generate_sections(
+        "Judul", "topik", "pembaca", plan, workers=workers
+    )
+    seconds = time.perf_counter() - start
+    for _, viz_path in results:
+        if viz_path:
+            os.remove(viz_path)
+    return seconds, generator.wrapper.rate_limiter.waited
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    client = FakeOpenAIClient(latency=args.latency, image_latency=args.image_latency)
+    generator = BookGenerator(llm_cache=None, client=client)
+    outline = generator.generate_outline(
+        "topik", "pembaca", "Judul", args.num_chapters, args.num_subsections
+    )
+    plan = generator.plan_sections(outline, preview=False)
+    sequential, _ = time_sections(generator, plan, 1, args.rpm, args.tpm)
+    concurrent, waited = time_sections(
+        generator, plan, args.workers, args.rpm, args.tpm
+    )
+    print(
+        json.dumps(
+            {
+                "sections": len(plan),
+                "sequential_seconds": round(sequential, 2),
+                "concurrent_seconds": round(concurrent, 2),
+                "workers": args.workers,
+                "speedup": round(sequential / concurrent, 2),
+                # Summed over workers, so it can exceed the wall time.
+                "rate_limit_wait_seconds": round(waited, 2),
+            },
+            indent=2,
+        )
+    )
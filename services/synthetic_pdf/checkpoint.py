@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_RUNS_DIR = "tmp/runs"
+
+
+class RunCheckpoint:
+    """Artifacts of one generator run, saved as files in a directory per input.
+
+    The directory is named after a digest of the run's inputs, so rerunning with
+    the same arguments finds everything an earlier (possibly crashed) run
+    already paid for. Files ending in .json hold JSON, .txt text and anything
+    else raw bytes. Each file is written to a temporary name first and then
+    renamed, so a crash never leaves a half-written artifact behind.
+    """
+
+    def __init__(self, root, **inputs):
+        payload = json.dumps(inputs, sort_keys=True)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        self.directory = os.path.join(root, digest[:16])
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "inputs.json"), "w") as handler:
+            handler.write(payload)
+        self.reused = 0
+        self.saved = 0
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name, produce):
+        """Returns the saved artifact name, or calls produce() and saves its result."""
+        path = self.path(name)
+        if os.path.exists(path):
+            with open(path, "rb") as handler:
+                data = handler.read()
+            with self.lock:
+                self.reused += 1
+            return self.decode(name, data)
+
+        value = produce()
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as handler:
+            handler.write(self.encode(name, value))
+        os.replace(temp_path, path)
+        with self.lock:
+            self.saved += 1
+        return value
+
+    @staticmethod
+    def encode(name, value):
+        if name.endswith(".json"):
+            return json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if name.endswith(".txt"):
+            return value.encode("utf-8")
+        return value
+
+    @staticmethod
+    def decode(name, data):
+        if name.endswith(".json"):
+            return json.loads(data)
+        if name.endswith(".txt"):
+            return data.decode("utf-8")
+        return data
+
+    def stats(self):
+        return {"directory": self.directory, "reused": self.reused, "saved": self.saved}
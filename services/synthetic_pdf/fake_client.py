@@ -0,0 +1,81 @@
+import base64
+import json
+import random
+import re
+import struct
+import time
+import zlib
+from types import SimpleNamespace
+
+WORDS = (
+    "bisnis data strategi pelanggan teknologi model analisis pasar proses tim "
+    "nilai produk layanan risiko investasi inovasi kinerja laporan digital"
+).split()
+
+
+def tiny_png():
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    pixels = zlib.compress(b"\x00\xc0\xc0\xc0")
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", pixels)
+        + chunk(b"IEND", b"")
+    )
+
+
+class FakeOpenAIClient:
+    """Offline stand-in for openai.OpenAI with the latency of a real API.
+
+    Chat completions sleep for latency seconds and return filler text (or a
+    well-formed outline for outline prompts); image generations sleep for
+    image_latency seconds and return a 1x1 PNG. Used to run and time the
+    generator without network access or API costs.
+    """
+
+    def __init__(self, latency=1.0, image_latency=2.0, words=600):
+        self.latency = latency
+        self.image_latency = image_latency
+        self.words = words
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.images = SimpleNamespace(generate=self._image)
+
+    def _chat(self, model, messages, **kwargs):
+        time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        rng = random.Random(prompt)
+        chapters = re.search(r"memiliki (\d+) bab", prompt)
+        subsections = re.search(r"tepat (\d+) subbab", prompt)
+        if chapters and subsections:
+            text = json.dumps(
+                {
+                    f"Bab {i}: Judul bab contoh nomor {i}": [
+                        f"{i}.{j}: Subbab contoh {i}.{j}"
+                        for j in range(1, int(subsections.group(1)) + 1)
+                    ]
+                    for i in range(1, int(chapters.group(1)) + 1)
+                }
+            )
+        elif "'True' or 'False'" in prompt:
+            text = "True"
+        else:
+            text = " ".join(rng.choice(WORDS) for _ in range(self.words)).capitalize()
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = len(text) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def _image(self, **kwargs):
+        time.sleep(self.image_latency)
+        image = base64.b64encode(tiny_png()).decode("ascii")
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=image)])
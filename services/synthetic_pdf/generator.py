@@ -1,13 +1,18 @@
 import argparse
 import json
+import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from docx import Document
 from docx2pdf import convert
 from docx.shared import Inches, Mm
 from docxtpl import DocxTemplate, InlineImage
-from wrapper import OpenAIWrapper
+from checkpoint import DEFAULT_RUNS_DIR, RunCheckpoint
+from fake_client import FakeOpenAIClient
+from ratelimit import RateLimiter
+from wrapper import DEFAULT_CACHE_PATH, OpenAIWrapper
 
 
 def parse_arguments():
@@ -37,14 +42,68 @@ def parse_arguments():
         "--preview", action="store_true", help="Generate preview version"
     )
     parser.add_argument("--preview-image", type=str, help="Preview image path")
+    parser.add_argument(
+        "--llm-cache",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help="SQLite file caching LLM responses across runs",
+    )
+    parser.add_argument(
+        "--no-llm-cache", action="store_true", help="Always call the LLM API"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Sections generated at the same time"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=500, help="API requests per minute limit"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=30000, help="API tokens per minute limit"
+    )
+    parser.add_argument(
+        "--fake-llm",
+        action="store_true",
+        help="Use a local fake API client (no key needed, filler content)",
+    )
+    parser.add_argument(
+        "--runs-dir",
+        type=str,
+        default=DEFAULT_RUNS_DIR,
+        help="Directory keeping the artifacts of each run, to resume it",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Do not save or reuse artifacts of earlier runs",
+    )
     return parser.parse_args()
 
 
 class BookGenerator:
-    def __init__(self) -> None:
-        self.wrapper = OpenAIWrapper()
+    def __init__(
+        self,
+        llm_cache=DEFAULT_CACHE_PATH,
+        client=None,
+        rate_limiter=None,
+        checkpoint=None,
+    ) -> None:
+        self.wrapper = OpenAIWrapper(
+            cache_path=llm_cache, client=client, rate_limiter=rate_limiter
+        )
+        self.checkpoint = checkpoint
+
+    def checkpointed(self, name, produce):
+        """Returns artifact name saved by an earlier run, or produces and saves it."""
+        if self.checkpoint is None:
+            return produce()
+        return self.checkpoint.get(name, produce)
 
     def generate_title(self, topic, target_audience):
+        return self.checkpointed(
+            "title.txt", lambda: self.write_title(topic, target_audience)
+        )
+
+    def write_title(self, topic, target_audience):
         convo_id = self.wrapper.start_convo(
             system="You are a book author with 20+ experience."
         )
@@ -73,6 +132,17 @@ class BookGenerator:
 
     def generate_outline(
         self, topic, target_audience, title, num_chapters, num_subsections
+    ):
+        # Only saved once it parsed and verified, so a rerun asks again.
+        return self.checkpointed(
+            "outline.json",
+            lambda: self.write_outline(
+                topic, target_audience, title, num_chapters, num_subsections
+            ),
+        )
+
+    def write_outline(
+        self, topic, target_audience, title, num_chapters, num_subsections
     ):
         convo_id = self.wrapper.start_convo(
             "You are a book author with 20+ experience."
@@ -93,9 +163,14 @@ class BookGenerator:
         outline_json = outline_json[
             outline_json.find("{") : outline_json.rfind("}") + 1
         ]
-        outline = json.loads(outline_json)
-        if not self.verify_outline(outline, num_chapters, num_subsections):
-            raise Exception("Outline not well formed!")
+        try:
+            outline = json.loads(outline_json)
+            if not self.verify_outline(outline, num_chapters, num_subsections):
+                raise Exception("Outline not well formed!")
+        except Exception:
+            # Otherwise a rerun would replay the same reply from the LLM cache.
+            self.wrapper.discard_reply(convo_id)
+            raise
         return outline
 
     def generate_chapter_content(
@@ -147,6 +222,64 @@ class BookGenerator:
             pass
         return content
 
+    def plan_sections(self, outline, preview):
+        """Every section of the book in outline order.
+
+        Each is (chapter number, chapter, index, subtopic, is chapter intro).
+        """
+        plan = []
+        for chapter_num, (chapter, subtopics) in enumerate(outline.items(), start=1):
+            plan.append((chapter_num, chapter, 0, "Introduction", True))
+            for idx, subtopic in enumerate(subtopics):
+                if preview and idx >= 2:
+                    break
+                plan.append((chapter_num, chapter, idx, subtopic, False))
+            if preview:
+                break
+        return plan
+
+    def generate_section(self, title, topic, target_audience, section):
+        """Writes one section and, when it is long enough, its visualization."""
+        chapter_num, chapter, idx, subtopic, intro = section
+        name = (
+            f"chapter_{chapter_num}_intro"
+            if intro
+            else f"chapter_{chapter_num}_{idx+1}"
+        )
+        content = self.checkpointed(
+            name + ".txt",
+            lambda: self.generate_chapter_content(
+                title, topic, target_audience, idx, chapter, subtopic
+            ),
+        )
+        viz_path = None
+        if intro or len(content) > 300:
+            try:
+                viz_path = self.generate_visualization(
+                    title, content, chapter_num if intro else f"{chapter_num}_{idx+1}"
+                )
+            except Exception as e:
+                target = f"chapter {chapter_num}" if intro else f"subtopic {subtopic}"
+                print(f"Warning: Could not generate visualization for {target}: {e}")
+        return content, viz_path
+
+    def generate_sections(self, title, topic, target_audience, plan, workers=1):
+        """Generates the planned sections, up to workers at a time.
+
+        Sections are independent once the outline exists; the wrapper's rate
+        limiter keeps the calls within the API limits. Results come back in
+        plan order.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    lambda section: self.generate_section(
+                        title, topic, target_audience, section
+                    ),
+                    plan,
+                )
+            )
+
     def generate_docs(
         self,
         topic,
@@ -157,6 +290,7 @@ class BookGenerator:
         book_template,
         preview,
         actionable_steps=False,
+        workers=1,
     ):
         document = Document(book_template)
         document.add_page_break()
@@ -168,78 +302,42 @@ class BookGenerator:
                 document.add_heading("\t" + subtopic, level=3)
 
         document.add_page_break()
-        chapter_num = 1
-
-        for chapter, subtopics in outline.items():
-            document.add_heading(chapter, level=1)
-
-            intro_content = self.generate_chapter_content(
-                title, topic, target_audience, 0, chapter, "Introduction"
-            )
-            time.sleep(1)
-            document.add_paragraph(intro_content)
-
-            try:
-                viz_path = self.generate_visualization(
-                    title, intro_content, chapter_num
-                )
-                document.add_picture(viz_path, width=Inches(6))
-                document.add_paragraph(
-                    "Figure " + str(chapter_num) + ": Chapter Overview Visualization"
-                )
-            except Exception as e:
-                print(
-                    f"Warning: Could not generate visualization for chapter {chapter_num}: {e}"
-                )
-
-            subtopics_content = []
-            for idx, subtopic in enumerate(subtopics):
-                if preview and idx >= 2:
-                    break
 
+        plan = self.plan_sections(outline, preview)
+        results = self.generate_sections(
+            title, topic, target_audience, plan, workers=workers
+        )
+        for section, (content, viz_path) in zip(plan, results):
+            chapter_num, chapter, idx, subtopic, intro = section
+            if intro:
+                if chapter_num > 1:
+                    document.add_page_break()
+                document.add_heading(chapter, level=1)
+            else:
                 document.add_heading(subtopic, level=2)
-                content = self.generate_chapter_content(
-                    title, topic, target_audience, idx, chapter, subtopic
-                )
-                time.sleep(1)
-                document.add_paragraph(content)
-
-                if len(content) > 300:
-                    try:
-                        viz_path = self.generate_visualization(
-                            title, content, f"{chapter_num}_{idx+1}"
-                        )
-                        document.add_picture(viz_path, width=Inches(5))
-                        document.add_paragraph(
-                            f"Figure {chapter_num}.{idx+1}: {subtopic} Visualization"
-                        )
-                    except Exception as e:
-                        print(
-                            f"Warning: Could not generate visualization for subtopic {subtopic}: {e}"
-                        )
-
-                subtopics_content.append(content)
-
-            if preview:
-                document.add_heading(
-                    "Preview Completed - Purchase Full Book To Read More!"
-                )
-                break
-
-            if chapter_num < len(outline.items()):
-                document.add_page_break()
-            chapter_num += 1
-
+            document.add_paragraph(content)
+            if viz_path is None:
+                continue
             try:
-                import os
-
-                for file in os.listdir("tmp"):
-                    if file.startswith(f"chapter_{chapter_num}") and file.endswith(
-                        ".png"
-                    ):
-                        os.remove(os.path.join("tmp", file))
+                if intro:
+                    document.add_picture(viz_path, width=Inches(6))
+                    document.add_paragraph(
+                        "Figure "
+                        + str(chapter_num)
+                        + ": Chapter Overview Visualization"
+                    )
+                else:
+                    document.add_picture(viz_path, width=Inches(5))
+                    document.add_paragraph(
+                        f"Figure {chapter_num}.{idx+1}: {subtopic} Visualization"
+                    )
             except Exception as e:
-                print(f"Warning: Could not clean up visualization files: {e}")
+                print(f"Warning: Could not add visualization {viz_path}: {e}")
+            finally:
+                os.remove(viz_path)
+
+        if preview:
+            document.add_heading("Preview Completed - Purchase Full Book To Read More!")
 
         document.save(docx_file)
 
@@ -281,6 +379,14 @@ class BookGenerator:
                 print(f"Warning: Could not clean up temporary files: {e}")
 
     def generate_cover_photo(self, title, topic, target_audience, img_output):
+        img_data = self.checkpointed(
+            "cover.png",
+            lambda: self.draw_cover_photo(title, topic, target_audience),
+        )
+        with open(img_output, "wb") as handler:
+            handler.write(img_data)
+
+    def draw_cover_photo(self, title, topic, target_audience):
         convo_id = self.wrapper.start_convo(
             "You are a book author with 20+ experience."
         )
@@ -297,15 +403,26 @@ class BookGenerator:
         dalle_prompt = self.wrapper.msg_in_convo(convo_id, cover_prompt)
         print(dalle_prompt)
 
-        img_data = self.wrapper.generate_photo(dalle_prompt)
-        with open(img_output, "wb") as handler:
-            handler.write(img_data)
+        return self.wrapper.generate_photo(dalle_prompt)
 
     def generate_visualization(self, title, content, chapter_num):
         """
         Generates a relevant visualization based on the chapter content.
         Returns the image in PNG format.
         """
+        img_data = self.checkpointed(
+            f"chapter_{chapter_num}_viz.png",
+            lambda: self.draw_visualization(title, content),
+        )
+
+        # Save the visualization
+        img_path = f"tmp/chapter_{chapter_num}_viz.png"
+        with open(img_path, "wb") as handler:
+            handler.write(img_data)
+
+        return img_path
+
+    def draw_visualization(self, title, content):
         convo_id = self.wrapper.start_convo(
             "You are a data visualization expert with 20+ years of experience."
         )
@@ -317,19 +434,28 @@ class BookGenerator:
         )
 
         dalle_prompt = self.wrapper.msg_in_convo(convo_id, viz_prompt)
-        img_data = self.wrapper.generate_photo(dalle_prompt)
-
-        # Save the visualization
-        img_path = f"tmp/chapter_{chapter_num}_viz.png"
-        with open(img_path, "wb") as handler:
-            handler.write(img_data)
-
-        return img_path
+        return self.wrapper.generate_photo(dalle_prompt)
 
 
 if __name__ == "__main__":
     args = parse_arguments()
-    generator = BookGenerator()
+    checkpoint = None
+    if not args.no_resume:
+        checkpoint = RunCheckpoint(
+            args.runs_dir,
+            topic=args.topic,
+            target_audience=args.target_audience,
+            num_chapters=args.num_chapters,
+            num_subsections=args.num_subsections,
+            fake_llm=args.fake_llm,
+        )
+    generator = BookGenerator(
+        # Fake answers must never end up in the cache of real ones.
+        llm_cache=None if args.no_llm_cache or args.fake_llm else args.llm_cache,
+        client=FakeOpenAIClient() if args.fake_llm else None,
+        rate_limiter=RateLimiter(args.rpm, args.tpm),
+        checkpoint=checkpoint,
+    )
 
     title = generator.generate_title(
         topic=args.topic, target_audience=args.target_audience
@@ -353,6 +479,7 @@ if __name__ == "__main__":
         docx_file=args.output_docx,
         book_template=args.book_template,
         preview=args.preview,
+        workers=args.workers,
     )
 
     cover_image_path = "tmp/image.png"
@@ -371,3 +498,7 @@ if __name__ == "__main__":
         output_file=args.output_pdf,
         preview=args.preview_image or cover_image_path,
     )
+    if generator.wrapper.cache:
+        print("LLM cache: ", generator.wrapper.cache.stats())
+    if checkpoint:
+        print("Checkpoint: ", checkpoint.stats())
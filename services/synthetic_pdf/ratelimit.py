@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Holds up to capacity units and refills capacity units per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        # A request larger than the whole bucket waits for a full bucket.
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+class RateLimiter:
+    """Blocks callers so requests/min and tokens/min stay within the API limits.
+
+    Callers reserve an estimate of the tokens a request will use before
+    sending it and settle the difference once the real usage is known, so a
+    bad estimate is paid back (or spent) by later requests.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.lock = threading.Lock()
+        self.waited = 0.0
+        self.paused_until = 0.0
+
+    def acquire(self, tokens=0):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if wait == 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= tokens
+                    return
+                self.waited += wait
+            time.sleep(wait)
+
+    def backoff(self, seconds):
+        """Holds every caller for seconds, after the API answered 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def settle(self, estimated, used):
+        with self.lock:
+            self.tokens.level -= used - estimated
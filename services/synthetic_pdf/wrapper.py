@@ -1,38 +1,178 @@
+import base64
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+import time
 import uuid
 
 import openai
-import requests
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_CACHE_PATH = "tmp/llm-cache.sqlite"
+# Reserved against the tokens/min limit until the real usage is known.
+EXPECTED_COMPLETION_TOKENS = 1000
+# A request answered 429 is retried with the same model after 1, 2, 4... seconds.
+RATE_LIMIT_RETRIES = 6
+
+
+class ResponseCache:
+    """Chat completions stored in SQLite, keyed by model, messages and parameters.
+
+    Once the stored responses take more than max_bytes, the least recently used
+    ones are deleted. Safe to share between threads.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024**2):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+            "model TEXT, response TEXT, size INTEGER, last_used REAL)"
+        )
+        (self.size,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    @staticmethod
+    def key(model, messages, params):
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            return row[0]
+
+    def put(self, key, model, response):
+        with self.lock, self.connection:
+            old = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, len(response), time.time()),
+            )
+            self.size += len(response) - (old[0] if old else 0)
+            while self.size > self.max_bytes:
+                rows = self.connection.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used LIMIT 64"
+                ).fetchall()
+                if not rows:
+                    break
+                self.connection.executemany(
+                    "DELETE FROM responses WHERE key = ?", [(k,) for k, _ in rows]
+                )
+                self.size -= sum(size for _, size in rows)
+
+    def delete(self, key):
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.size -= row[0]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "size_mb": round(self.size / 2**20, 2),
+            }
+
 
 class OpenAIWrapper:
-    def __init__(self):
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, client=None, rate_limiter=None):
         self.api_key = os.environ.get("OPENAI_API_KEY")
         self.models = ["gpt-4o", "gpt-3.5-turbo-1106"]
-        self.model_index = 0
-        self.model = self.models[self.model_index]
-        self.client = openai.OpenAI()
+        # The model of the call in progress, which differs between threads.
+        self.local = threading.local()
+        self.client = client or openai.OpenAI()
+        self.rate_limiter = rate_limiter
         self.convos = dict()
+        # Cache key of the last reply in each conversation.
+        self.reply_keys = dict()
+        self.cache = ResponseCache(cache_path) if cache_path else None
+
+    @property
+    def model(self):
+        return getattr(self.local, "model", self.models[0])
 
     def retry(func):
         def wrapper(self, *args, **kwargs):
-            while self.model_index < len(self.models) - 1:
-                try:
-                    result = func(self, *args, **kwargs)
-                    return result
-                except Exception as e:
-                    print(f"Error with model {self.model}: {str(e)}")
-                    print(f"Switching to the next model in {self.models}")
-                    self.model_index += 1
-                    self.model = self.models[self.model_index]
-            else:
-                raise Exception(f"All models in {self.models} have been tried")
+            for model in self.models:
+                self.local.model = model
+                for attempt in range(RATE_LIMIT_RETRIES + 1):
+                    try:
+                        return func(self, *args, **kwargs)
+                    except openai.RateLimitError as e:
+                        if attempt == RATE_LIMIT_RETRIES:
+                            print(f"Still rate limited with model {model}: {str(e)}")
+                            break
+                        self.backoff(2**attempt)
+                    except Exception as e:
+                        print(f"Error with model {model}: {str(e)}")
+                        break
+                print(f"Switching to the next model in {self.models}")
+            raise Exception(f"All models in {self.models} have been tried")
 
         return wrapper
 
+    def backoff(self, seconds):
+        if self.rate_limiter:
+            # Every worker shares the account's limit, so all of them wait.
+            self.rate_limiter.backoff(seconds)
+        else:
+            time.sleep(seconds)
+
+    def cache_key(self, messages):
+        return ResponseCache.key(self.model, messages, {})
+
+    def complete(self, messages):
+        """Returns the model's reply to messages, from the cache when possible."""
+        key = self.cache_key(messages)
+        text = self.cache.get(key) if self.cache else None
+        if text is None:
+            estimated = (
+                sum(len(message["content"]) for message in messages) // 4
+                + EXPECTED_COMPLETION_TOKENS
+            )
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimated)
+            response = self.client.chat.completions.create(
+                model=self.model, messages=messages
+            )
+            if self.rate_limiter and response.usage:
+                self.rate_limiter.settle(estimated, response.usage.total_tokens)
+            text = response.choices[0].message.content.strip()
+            if self.cache:
+                self.cache.put(key, self.model, text)
+        return text
+
     @retry
     def start_convo(self, system):
         convo_id = str(uuid.uuid4())
@@ -41,22 +181,26 @@ class OpenAIWrapper:
 
     @retry
     def msg_in_convo(self, convo_id, prompt):
-        self.convos[convo_id].append({"role": "user", "content": prompt})
-        response = self.client.chat.completions.create(
-            model=self.model, messages=self.convos[convo_id]
-        )
-        text = response.choices[0].message.content.strip()
-        self.convos[convo_id].append({"role": "assistant", "content": text})
+        # Only added to the conversation once answered, so a retry sends it once.
+        messages = self.convos[convo_id] + [{"role": "user", "content": prompt}]
+        self.reply_keys[convo_id] = self.cache_key(messages)
+        text = self.complete(messages)
+        messages.append({"role": "assistant", "content": text})
+        self.convos[convo_id] = messages
         return text
 
+    def discard_reply(self, convo_id):
+        """Forgets the last prompt and reply, so asking again calls the API."""
+        del self.convos[convo_id][-2:]
+        key = self.reply_keys.pop(convo_id)
+        if self.cache:
+            self.cache.delete(key)
+
     @retry
     def ask_question_in_convo(self, convo_id, question):
         question += "Answer with only a single word: 'True' or 'False'"
-        self.convos[convo_id].append({"role": "user", "content": question})
-        response = self.client.chat.completions.create(
-            model=self.model, messages=self.convos[convo_id]
-        )
-        text = response.choices[0].message.content.strip()
+        messages = self.convos[convo_id] + [{"role": "user", "content": question}]
+        text = self.complete(messages)
         response = True
         if text.lower() == "true":
             response = True
@@ -65,19 +209,23 @@ class OpenAIWrapper:
         else:
             raise Exception("Respose is not a bool")
 
-        self.convos[convo_id].append({"role": "assistant", "content": text})
+        messages.append({"role": "assistant", "content": text})
+        self.convos[convo_id] = messages
         return response
 
     @retry
     def generate_photo(self, photo_prompt):
         improved_gpt_prompt = f"A positive image of: {photo_prompt}, rendered artistically in a chic, cartooney, minimalistic style"
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        # Returned inline, which saves downloading the image from a URL.
         response = self.client.images.generate(
             model="dall-e-2",
             prompt=improved_gpt_prompt,
             size="512x512",
             quality="standard",
             n=1,
+            response_format="b64_json",
         )
-        image_url = response.data[0].url
-        img_data = requests.get(image_url).content
+        img_data = base64.b64decode(response.data[0].b64_json)
         return img_data